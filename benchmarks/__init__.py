@@ -0,0 +1,10 @@
+"""
+Benchmark suite for the DNA Analysis Report System.
+
+Generates seeded synthetic AncestryDNA files and YAML gene catalogs, times
+each pipeline phase and the end-to-end main() flow, and compares the
+results against a saved JSON baseline.
+
+Usage:
+    python -m benchmarks.run --rows 100000 700000 --genes 400
+"""
@@ -0,0 +1,276 @@
+"""
+Benchmark runner.
+
+Times each pipeline phase and the end-to-end main() flow on synthetic
+inputs, writes the results as JSON and optionally compares them against a
+baseline, exiting non-zero when a phase regresses past the threshold.
+
+Usage:
+    python -m benchmarks.run --rows 100000 700000 --genes 400 --output bench.json
+    python -m benchmarks.run --baseline bench.json --threshold 0.25
+"""
+
+import argparse
+import io
+import json
+import os
+import platform
+import shutil
+import sys
+import tracemalloc
+from typing import Any, Callable, Dict, List, Optional
+
+import dna_analysis_system as das
+from benchmarks import synthetic
+
+
+def prepare_inputs(work_dir: str, rows: int, genes: int, seed: int) -> Dict[str, str]:
+    """Generate (or reuse) the synthetic DNA file and catalog for one case."""
+    dna_path = os.path.join(work_dir, f"ancestry-{rows}-seed{seed}.txt")
+    catalog_path = os.path.join(work_dir, f"catalog-{genes}-rows{rows}-seed{seed}")
+
+    if not os.path.exists(dna_path):
+        das.logger.warning("Generating synthetic DNA file with %d rows", rows)
+        synthetic.generate_ancestry_file(dna_path + '.tmp', rows, seed=seed)
+        os.replace(dna_path + '.tmp', dna_path)
+
+    if not os.path.isdir(catalog_path):
+        das.logger.warning("Generating synthetic catalog with %d genes", genes)
+        synthetic.generate_catalog(catalog_path + '.tmp', genes, dna_rows=rows, seed=seed)
+        os.replace(catalog_path + '.tmp', catalog_path)
+
+    return {'dna': dna_path, 'catalog': catalog_path}
+
+
+def clear_caches(inputs: Dict[str, str]):
+    """Remove the DNA sidecar cache and the catalog snapshot."""
+    for path in (
+        inputs['dna'] + das.DNAParser.CACHE_SUFFIX,
+        os.path.join(inputs['catalog'], das.GeneCatalogLoader.SNAPSHOT_NAME)
+    ):
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def measure(
+    name: str,
+    func: Callable[[], Any],
+    repeat: int,
+    setup: Optional[Callable[[], None]] = None,
+    trace_memory: bool = False
+) -> Dict[str, Any]:
+    """
+    Run func `repeat` times and keep the fastest wall time.
+
+    The process peak RSS comes from PipelineMetrics; it is a high-water mark
+    for the whole run so far, so it only grows from phase to phase. With
+    trace_memory, one extra run under tracemalloc records the peak Python
+    allocation of the phase itself.
+    """
+    best: Optional[das.PhaseMetrics] = None
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        metrics = das.PipelineMetrics()
+        with metrics.phase(name):
+            func()
+        phase = metrics.phases[0]
+        if best is None or phase.wall_seconds < best.wall_seconds:
+            best = phase
+
+    result = {'wall_seconds': best.wall_seconds, 'process_peak_rss_bytes': best.process_peak_rss_bytes}
+
+    if trace_memory:
+        if setup is not None:
+            setup()
+        tracemalloc.start()
+        try:
+            func()
+            result['python_peak_bytes'] = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+    return result
+
+
+def run_case(
+    inputs: Dict[str, str],
+    work_dir: str,
+    repeat: int,
+    workers: int,
+    trace_memory: bool
+) -> Dict[str, Dict[str, Any]]:
+    """Benchmark every phase and the end-to-end flow for one input size."""
+    dna_path, catalog_path = inputs['dna'], inputs['catalog']
+    report_path = os.path.join(work_dir, 'report.md')
+    results: Dict[str, Dict[str, Any]] = {}
+
+    def load_catalog():
+        return das.GeneCatalogLoader(catalog_path, use_snapshot=True, workers=workers).load()
+
+    def remove_snapshot():
+        snapshot = os.path.join(catalog_path, das.GeneCatalogLoader.SNAPSHOT_NAME)
+        if os.path.exists(snapshot):
+            os.remove(snapshot)
+
+    results['catalog_cold'] = measure('catalog_cold', load_catalog, repeat, remove_snapshot, trace_memory)
+    results['catalog_warm'] = measure('catalog_warm', load_catalog, repeat, None, trace_memory)
+
+    genes = load_catalog()
+    targets = das.GeneCatalogLoader.collect_rsids(genes)
+
+    results['parse_text'] = measure(
+        'parse_text', lambda: das.DNAParser(dna_path).parse(), repeat, None, trace_memory
+    )
+    results['parse_targeted'] = measure(
+        'parse_targeted',
+        lambda: das.DNAParser(dna_path, target_rsids=targets).parse(),
+        repeat, None, trace_memory
+    )
+
+    das.DNAParser(dna_path, use_cache=True).parse()
+    results['parse_cached'] = measure(
+        'parse_cached', lambda: das.DNAParser(dna_path, use_cache=True).parse(), repeat, None, trace_memory
+    )
+
+    genotypes = das.DNAParser(dna_path, use_cache=True).parse()
+    index = das.GeneCatalogLoader.build_index(genes)
+    results['match'] = measure(
+        'match', lambda: das.VariantMatcher(genotypes, index).match(genes), repeat, None, trace_memory
+    )
+
+    match_results = das.VariantMatcher(genotypes, index).match(genes)
+    results['report'] = measure(
+        'report',
+        lambda: das.ReportGenerator(genes, match_results, dna_path).generate(io.StringIO()),
+        repeat, None, trace_memory
+    )
+
+    argv = [
+        dna_path, '--catalog', catalog_path, '--output', report_path,
+        '--workers', str(workers), '--log-level', 'WARNING'
+    ]
+    results['end_to_end_cold'] = measure(
+        'end_to_end_cold', lambda: das.main(argv), repeat, lambda: clear_caches(inputs), trace_memory
+    )
+    results['end_to_end_warm'] = measure(
+        'end_to_end_warm', lambda: das.main(argv), repeat, None, trace_memory
+    )
+
+    return results
+
+
+def compare(
+    current: Dict[str, Any],
+    baseline: Dict[str, Any],
+    threshold: float,
+    min_seconds: float
+) -> List[str]:
+    """
+    Compare results against a baseline.
+
+    Returns:
+        One message per metric that got slower (or, with tracemalloc data
+        on both sides, bigger) by more than `threshold`.
+    """
+    regressions = []
+    for case, phases in current['cases'].items():
+        base_phases = baseline.get('cases', {}).get(case, {})
+        for phase, result in phases.items():
+            base = base_phases.get(phase)
+            if base is None:
+                continue
+
+            now, before = result['wall_seconds'], base['wall_seconds']
+            if now > min_seconds and now > before * (1 + threshold):
+                regressions.append(
+                    f"{case} {phase}: {before:.4f}s -> {now:.4f}s (+{(now / before - 1) * 100:.0f}%)"
+                    if before > 0 else f"{case} {phase}: {before:.4f}s -> {now:.4f}s"
+                )
+
+            if 'python_peak_bytes' in result and 'python_peak_bytes' in base:
+                now, before = result['python_peak_bytes'], base['python_peak_bytes']
+                if before > 0 and now > before * (1 + threshold):
+                    regressions.append(
+                        f"{case} {phase}: peak {before} -> {now} bytes (+{(now / before - 1) * 100:.0f}%)"
+                    )
+
+    return regressions
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description='DNA analysis benchmarks')
+    parser.add_argument('--rows', type=int, nargs='+', default=[100_000], help='DNA file sizes (100k-5M)')
+    parser.add_argument('--genes', type=int, nargs='+', default=[400], help='catalog sizes (400-50k)')
+    parser.add_argument('--seed', type=int, default=1, help='seed for the synthetic inputs')
+    parser.add_argument('--repeat', type=int, default=3, help='runs per phase; the fastest is kept')
+    parser.add_argument('--workers', type=int, default=1, help='catalog loader worker processes')
+    parser.add_argument('--work-dir', default='.benchmarks', help='where synthetic inputs are kept')
+    parser.add_argument('--tracemalloc', action='store_true', help='also record peak Python allocations')
+    parser.add_argument('--output', help='write results to this JSON file')
+    parser.add_argument('--baseline', help='compare against this JSON results file')
+    parser.add_argument('--threshold', type=float, default=0.25, help='allowed slowdown ratio (0.25 = 25%%)')
+    parser.add_argument(
+        '--min-seconds', type=float, default=0.005,
+        help='ignore wall-time regressions on phases faster than this'
+    )
+    parser.add_argument('--clean', action='store_true', help='delete the work directory first')
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Run the benchmarks; returns the process exit code."""
+    args = parse_args(argv)
+    das.configure_logging('WARNING')
+
+    if args.clean and os.path.isdir(args.work_dir):
+        shutil.rmtree(args.work_dir)
+    os.makedirs(args.work_dir, exist_ok=True)
+
+    current: Dict[str, Any] = {
+        'meta': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'seed': args.seed,
+            'repeat': args.repeat,
+            'workers': args.workers
+        },
+        'cases': {}
+    }
+
+    for rows in args.rows:
+        for genes in args.genes:
+            case = f"rows={rows} genes={genes}"
+            inputs = prepare_inputs(args.work_dir, rows, genes, args.seed)
+            results = run_case(inputs, args.work_dir, args.repeat, args.workers, args.tracemalloc)
+            current['cases'][case] = results
+
+            print(case)
+            for phase, result in results.items():
+                print(
+                    f"  {phase:<18} {result['wall_seconds']:9.4f}s"
+                    f"  process peak RSS {result['process_peak_rss_bytes'] / 2**20:8.1f} MiB"
+                )
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(current, f, indent=2)
+            f.write('\n')
+
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare(current, baseline, args.threshold, args.min_seconds)
+        if regressions:
+            print("Regressions:")
+            for message in regressions:
+                print(f"- {message}")
+            return 1
+        print(f"No regressions beyond {args.threshold:.0%} against {args.baseline}")
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,150 @@
+"""
+Seeded synthetic inputs for benchmarks.
+
+Row i of a synthetic DNA file always gets the same rsid and coordinates
+for a given row count, so a catalog generated for that row count can
+point at rsids (and positions) that are present in the file.
+"""
+
+import os
+import random
+from typing import List, Tuple
+
+import yaml
+
+
+CATEGORIES = [
+    'top-priority-genes',
+    'high-impact-health-genes',
+    'metabolism-detoxification-genes',
+    'cardiovascular-heart-health-genes',
+    'immune-inflammation-genes',
+    'brain-mental-health-genes',
+    'sleep-circadian-rhythm-genes',
+    'hormone-reproductive-health-genes',
+    'nutrient-metabolism-genes',
+    'additional-important-genes'
+]
+
+# Ancestry encodes X, Y, the pseudoautosomal region and MT as 23-26
+ANCESTRY_CHROMOSOMES = [str(c) for c in range(1, 27)]
+
+# rsid(i) = (i * MULTIPLIER) % MODULUS + 1 is a permutation of [1, MODULUS],
+# which gives unique, unsorted rsids without keeping a set in memory
+RSID_MULTIPLIER = 2654435761
+RSID_MODULUS = 1_000_000_007
+
+ANCESTRY_HEADER = (
+    "#AncestryDNA raw data download\n"
+    "#This file was generated by the DNA analysis benchmark suite.\n"
+    "#Synthetic data only; it does not describe a real person.\n"
+    "rsid\tchromosome\tposition\tallele1\tallele2\n"
+)
+
+
+def row_rsid(i: int) -> str:
+    """Return the rsid of synthetic row i."""
+    return f"rs{(i * RSID_MULTIPLIER) % RSID_MODULUS + 1}"
+
+
+def row_coordinates(i: int, rows: int) -> Tuple[str, int]:
+    """Return the (chromosome, position) of synthetic row i in a file of `rows` rows."""
+    per_chromosome = rows // len(ANCESTRY_CHROMOSOMES) + 1
+    return ANCESTRY_CHROMOSOMES[i // per_chromosome], 10_000 + (i % per_chromosome) * 97
+
+
+def generate_ancestry_file(
+    path: str,
+    rows: int,
+    seed: int = 0,
+    no_call_rate: float = 0.01,
+    heterozygous_rate: float = 0.3
+):
+    """Write a synthetic AncestryDNA raw data file with `rows` genotype rows."""
+    rng = random.Random(seed)
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+
+    with open(path, 'w', encoding='utf-8', buffering=1 << 20) as f:
+        f.write(ANCESTRY_HEADER)
+        lines = []
+        for i in range(rows):
+            chromosome, position = row_coordinates(i, rows)
+            roll = rng.random()
+            if roll < no_call_rate:
+                allele1 = allele2 = '0'
+            else:
+                allele1 = rng.choice('ACGT')
+                allele2 = rng.choice('ACGT') if roll < heterozygous_rate else allele1
+            lines.append(f"{row_rsid(i)}\t{chromosome}\t{position}\t{allele1}\t{allele2}\n")
+            if len(lines) == 10_000:
+                f.writelines(lines)
+                lines.clear()
+        f.writelines(lines)
+
+
+def generate_catalog(
+    path: str,
+    genes: int,
+    dna_rows: int,
+    seed: int = 0,
+    coverage: float = 0.85,
+    max_variants: int = 4
+) -> List[str]:
+    """
+    Write a synthetic YAML gene catalog with `genes` genes.
+
+    About `coverage` of the variant rsids point at rows of a synthetic DNA
+    file with `dna_rows` rows; the rest are absent from it.
+
+    Returns:
+        Paths of the written YAML files.
+    """
+    rng = random.Random(seed)
+    absent_start = dna_rows
+    paths = []
+
+    for gene_idx in range(genes):
+        category = CATEGORIES[gene_idx % len(CATEGORIES)]
+        category_dir = os.path.join(path, category)
+        os.makedirs(category_dir, exist_ok=True)
+
+        variants = []
+        for variant_idx in range(rng.randint(1, max_variants)):
+            if rng.random() < coverage:
+                row = rng.randrange(dna_rows)
+                chromosome, position = row_coordinates(row, dna_rows)
+            else:
+                row = absent_start + rng.randrange(dna_rows)
+                chromosome, position = str(rng.randint(1, 22)), rng.randint(10_000, 200_000_000)
+            variant = {
+                'variant': f"V{variant_idx + 1}",
+                'rsid': row_rsid(row),
+                'chromosome': chromosome,
+                'position': position,
+                'description': f"Synthetic variant {variant_idx + 1} of gene {gene_idx}."
+            }
+            if rng.random() < 0.5:
+                variant['risk_allele'] = rng.choice('ACGT')
+            variants.append(variant)
+
+        symbol = f"SYN{gene_idx}"
+        data = {
+            'gene': symbol,
+            'full_name': f"Synthetic Gene {gene_idx}",
+            'category': category,
+            'function': "Synthetic gene used for benchmarking.",
+            'health_impact': ["Benchmark trait A", "Benchmark trait B"],
+            'common_variants': variants,
+            'additional_rsids': [row_rsid(rng.randrange(2 * dna_rows))],
+            'ancestry_compatibility': rng.random() > 0.1,
+            'research_sources': ["Synthetic"],
+            'notes': "Generated by benchmarks.synthetic.",
+            'gene_description': "Synthetic gene description. " * 5
+        }
+
+        file_path = os.path.join(category_dir, f"{symbol.lower()}.yaml")
+        with open(file_path, 'w', encoding='utf-8') as f:
+            yaml.safe_dump(data, f, sort_keys=False)
+        paths.append(file_path)
+
+    return paths
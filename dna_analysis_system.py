@@ -2,21 +2,59 @@
 """
 DNA Analysis Report System
 
-This system parses Ancestry.com raw DNA test results, matches variants against
-the gene catalog in hidden/important-genes-2/, and generates a comprehensive
-analysis report (SUMMARY-FROM-RAW-DNA.md).
+This system parses raw DNA test results (AncestryDNA, 23andMe, MyHeritage,
+FamilyTreeDNA or VCF), matches variants against the gene catalog in
+hidden/important-genes-2/, and generates a comprehensive analysis report
+(SUMMARY-FROM-RAW-DNA.md).
 
 Usage:
     python dna_analysis_system.py
 """
 
+import argparse
+import gzip
+import hashlib
+import importlib.util
+import io
+import ipaddress
+import json
+import logging
+import mmap
+import operator
 import os
+import pickle
+import re
+import signal
+import socketserver
+import sqlite3
+import struct
 import sys
+import threading
+import time
 import yaml
+import zipfile
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import Counter
+from collections.abc import Mapping
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from contextlib import contextmanager
 from dataclasses import dataclass, field
-from typing import Dict, List, Optional, Set
+from typing import Any, BinaryIO, Callable, Dict, Iterator, List, Optional, Sequence, Set, TextIO, Tuple, Union
 from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from itertools import compress, islice, repeat
+from json.encoder import encode_basestring_ascii
 from pathlib import Path
+from stat import S_ISSOCK
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+
+logger = logging.getLogger('dna_analysis_system')
 
 
 # ============================================================================
@@ -39,7 +77,7 @@ class Genotype:
         return self.allele1 == self.allele2
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class Variant:
     """Represents a genetic variant from gene catalog."""
     variant: str
@@ -47,33 +85,127 @@ class Variant:
     chromosome: str
     position: int
     description: str
+    risk_allele: Optional[str] = None
+
+    def __post_init__(self):
+        # The same few chromosome names repeat across the whole catalog
+        object.__setattr__(self, 'chromosome', sys.intern(self.chromosome))
 
+    def __reduce__(self):
+        # Rebuild through __init__ so unpickled catalogs share interned strings
+        return Variant, (self.variant, self.rsid, self.chromosome, self.position, self.description, self.risk_allele)
 
-@dataclass(frozen=True, unsafe_hash=True)
+
+@dataclass(frozen=True, slots=True, eq=False)
 class Gene:
-    """Represents a gene from the catalog."""
+    """
+    Represents a gene from the catalog.
+
+    Genes are immutable. They compare and hash by `gene_id`, a stable
+    64-bit id derived from the category and symbol. The variants returned by
+    tracked_variants() are built once, when the gene is created.
+    """
     symbol: str
     full_name: str
     category: str
     function: str
-    health_impact: List[str]
-    common_variants: List[Variant]
-    additional_rsids: List[str]
+    health_impact: Tuple[str, ...]
+    common_variants: Tuple[Variant, ...]
+    additional_rsids: Tuple[str, ...]
     ancestry_compatibility: bool
-    research_sources: List[str]
+    research_sources: Tuple[str, ...]
     notes: str
     gene_description: str
+    gene_id: int = field(init=False, repr=False)
+    _tracked_variants: Tuple[Variant, ...] = field(init=False, repr=False)
+
+    def __post_init__(self):
+        symbol = sys.intern(self.symbol)
+        category = sys.intern(self.category)
+        object.__setattr__(self, 'symbol', symbol)
+        object.__setattr__(self, 'category', category)
+        object.__setattr__(self, 'gene_id', self.make_id(category, symbol))
+
+        # Additional rsids that are not already listed as common variants
+        # become bare Variant entries without coordinates
+        known = {variant.rsid for variant in self.common_variants}
+        extra = tuple(
+            Variant(
+                variant=rsid,
+                rsid=rsid,
+                chromosome='',
+                position=0,
+                description=f"Additional rsid tracked for {symbol}."
+            )
+            for rsid in dict.fromkeys(self.additional_rsids) if rsid not in known
+        )
+        object.__setattr__(self, '_tracked_variants', self.common_variants + extra)
+
+    @staticmethod
+    def make_id(category: str, symbol: str) -> int:
+        """Return the stable id of the gene with this category and symbol."""
+        digest = hashlib.blake2b(f"{category}/{symbol}".encode('utf-8'), digest_size=8).digest()
+        # Signed, so it fits SQLite and Arrow int64 columns
+        return int.from_bytes(digest, 'big', signed=True)
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, Gene):
+            return NotImplemented
+        return self.gene_id == other.gene_id
+
+    def __hash__(self) -> int:
+        return self.gene_id
+
+    def __reduce__(self):
+        # Unpickling goes through __init__ too, which interns and recomputes gene_id
+        return Gene, (
+            self.symbol, self.full_name, self.category, self.function, self.health_impact,
+            self.common_variants, self.additional_rsids, self.ancestry_compatibility,
+            self.research_sources, self.notes, self.gene_description
+        )
 
+    def tracked_variants(self) -> Tuple[Variant, ...]:
+        """
+        Return every variant matched for this gene.
 
-@dataclass
+        Additional rsids that are not already listed as common variants are
+        included as bare Variant entries without coordinates.
+        """
+        return self._tracked_variants
+
+
+@dataclass(frozen=True, slots=True)
 class MatchedVariant:
-    """Represents a matched variant from DNA test."""
-    gene: Gene
-    variant: Variant
+    """
+    Represents a matched variant from DNA test.
+
+    The gene and variant are referenced by their position in the
+    CatalogIndex the match was made against.
+    """
+    index: 'CatalogIndex' = field(repr=False, compare=False)
+    gene_idx: int
+    variant_idx: int
     genotype: str
     genotype_type: str
-    interpretation: str
     is_risk_allele: bool
+    risk_allele_dosage: int = 0
+
+    @property
+    def gene(self) -> Gene:
+        """The matched gene."""
+        return self.index.genes[self.gene_idx]
+
+    @property
+    def variant(self) -> Variant:
+        """The matched variant of the gene."""
+        return self.index.variants[self.gene_idx][self.variant_idx]
+
+    @property
+    def interpretation(self) -> str:
+        """Human-readable interpretation, rendered only when a report asks for it."""
+        if self.genotype[0] == self.genotype[1]:
+            return f"Both alleles are {self.genotype[0]}. {self.variant.description}"
+        return f"One {self.genotype[0]} and one {self.genotype[1]} allele. {self.variant.description}"
 
 
 @dataclass
@@ -85,6 +217,8 @@ class MatchResults:
     total_variants_checked: int = 0
     total_variants_found: int = 0
     coverage_percentage: float = 0.0
+    variants_found_by_merged_rsid: int = 0
+    variants_found_by_position: int = 0
 
 
 @dataclass
@@ -99,131 +233,1633 @@ class CategoryStats:
     genes_without_matches: int = 0
 
 
+@dataclass
+class ReportGrouping:
+    """Genes and match results grouped once for every report section."""
+    genes_by_category: Dict[str, List[Gene]] = field(default_factory=dict)
+    # category -> gene symbol -> matches, in match order
+    matches_by_category: Dict[str, Dict[str, List[MatchedVariant]]] = field(default_factory=dict)
+    variants_checked_by_category: Dict[str, int] = field(default_factory=dict)
+    risk_variants: List[MatchedVariant] = field(default_factory=list)
+    genes_needing_testing: List[Gene] = field(default_factory=list)
+
+
+# ============================================================================
+# Instrumentation
+# ============================================================================
+
+def peak_rss_bytes() -> int:
+    """Return the process's peak resident set size in bytes, or 0 if unknown."""
+    if resource is None:
+        return 0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS reports bytes
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+@dataclass
+class PhaseMetrics:
+    """Timing and resource counters for one pipeline phase."""
+    name: str
+    wall_seconds: float = 0.0
+    rows_processed: int = 0
+    bytes_read: int = 0
+    # High-water mark of the whole process when the phase ended, not of the
+    # phase alone: phases share one process and may overlap
+    process_peak_rss_bytes: int = 0
+
+
+class PipelineMetrics:
+    """Collects per-phase metrics for a run and renders them as JSON."""
+
+    def __init__(self):
+        self.started_at = datetime.now().isoformat(timespec='seconds')
+        self._start = time.perf_counter()
+        self.phases: List[PhaseMetrics] = []
+        self.extra: Dict[str, Any] = {}
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[PhaseMetrics]:
+        """
+        Time a phase. The caller fills in rows_processed and bytes_read on
+        the yielded PhaseMetrics; wall time and the process peak RSS so far
+        are recorded on exit.
+        """
+        metrics = PhaseMetrics(name=name)
+        start = time.perf_counter()
+        try:
+            yield metrics
+        finally:
+            metrics.wall_seconds = time.perf_counter() - start
+            metrics.process_peak_rss_bytes = peak_rss_bytes()
+            self.phases.append(metrics)
+            logger.debug(
+                "Phase %s: %.3fs, %d rows, %d bytes read",
+                name, metrics.wall_seconds, metrics.rows_processed, metrics.bytes_read
+            )
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Return the metrics as plain data."""
+        return dict(
+            self.extra,
+            started_at=self.started_at,
+            # Phases may overlap, so the sum can exceed the elapsed time
+            total_wall_seconds=sum(p.wall_seconds for p in self.phases),
+            elapsed_seconds=time.perf_counter() - self._start,
+            peak_rss_bytes=peak_rss_bytes(),
+            phases=[vars(p) for p in self.phases]
+        )
+
+    def write_json(self, path: str):
+        """Write the metrics to a JSON file."""
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, indent=2)
+            f.write('\n')
+
+
+class PhaseScheduler:
+    """
+    Runs named pipeline phases as a small dependency graph on threads.
+
+    A phase starts as soon as every phase it depends on has finished, so
+    independent phases, such as loading the catalog and parsing the DNA
+    file, overlap. Each phase function receives the results of its
+    dependencies as keyword arguments named after them. The first phase to
+    fail stops the run and its exception is re-raised by run().
+    """
+
+    def __init__(self, max_workers: Optional[int] = None):
+        self.max_workers = max_workers
+        self.phases: Dict[str, Tuple[Callable[..., Any], Tuple[str, ...]]] = {}
+
+    def add(self, name: str, func: Callable[..., Any], after: Sequence[str] = ()):
+        """Add a phase that runs once every phase named in `after` has finished."""
+        for dependency in after:
+            if dependency not in self.phases:
+                raise ValueError(f"Phase {name!r} depends on unknown phase {dependency!r}")
+        self.phases[name] = (func, tuple(after))
+
+    def run(self) -> Dict[str, Any]:
+        """
+        Run every phase.
+
+        Returns:
+            Result of each phase, keyed by phase name.
+        """
+        results: Dict[str, Any] = {}
+        pending = dict(self.phases)
+        running: Dict[Future, str] = {}
+
+        with ThreadPoolExecutor(max_workers=self.max_workers or max(1, len(self.phases))) as executor:
+            try:
+                while pending or running:
+                    for name, (func, after) in list(pending.items()):
+                        if all(dependency in results for dependency in after):
+                            del pending[name]
+                            kwargs = {dependency: results[dependency] for dependency in after}
+                            running[executor.submit(func, **kwargs)] = name
+
+                    done, _ = wait(running, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        results[running.pop(future)] = future.result()
+            except BaseException:
+                for future in running:
+                    future.cancel()
+                raise
+
+        return results
+
+
+# ============================================================================
+# Genotype Store
+# ============================================================================
+
+# Allele codes packed into one byte per genotype: allele1 in the high nibble,
+# allele2 in the low nibble. Code 0 is the '0' no-call.
+ALLELES = '0ACGT'
+ALLELE_CODES = {allele: code for code, allele in enumerate(ALLELES)}
+
+VALID_ALLELES = frozenset(ALLELES + ALLELES.lower())
+
+# Genotype code for an rsid that is absent from a sample
+MISSING_GENOTYPE = 0xFF
+
+
+# One shared string per genotype, so match sets don't hold a copy per call
+_GENOTYPE_STRINGS = {
+    (first << 4) | second: sys.intern(ALLELES[first] + ALLELES[second])
+    for first in range(len(ALLELES)) for second in range(len(ALLELES))
+}
+
+
+def genotype_from_code(code: int) -> str:
+    """Decode a packed genotype code into its two-letter genotype string."""
+    return _GENOTYPE_STRINGS[code]
+
+
+def _allele_byte_table(shift: int, dash: bool = False) -> bytes:
+    """
+    Build a bytes.translate table from an allele byte to its code shifted
+    into one nibble. Other bytes map to 0xFF. With dash, '-' maps to the
+    otherwise unused 0x8 nibble so '--' no-calls can be told apart.
+    """
+    table = bytearray(b'\xff' * 256)
+    for allele, code in ALLELE_CODES.items():
+        table[ord(allele)] = table[ord(allele.lower())] = code << shift
+    if dash:
+        table[ord('-')] = 0x8 << shift
+    return bytes(table)
+
+
+ALLELE_HIGH_TABLE = _allele_byte_table(4)
+ALLELE_LOW_TABLE = _allele_byte_table(0)
+DASH_HIGH_TABLE = _allele_byte_table(4, dash=True)
+DASH_LOW_TABLE = _allele_byte_table(0, dash=True)
+
+# '--' (0x88) becomes the 00 no-call; a single '-' next to an allele is invalid
+DASH_FIXUP_TABLE = bytes(
+    0x00 if code == 0x88 else MISSING_GENOTYPE if code & 0x88 else code for code in range(256)
+)
+
+# bytes.translate tables flagging genotype codes with a '0' (no-call) allele,
+# and the fully called ones
+NO_CALL_TABLE = bytes(
+    1 if code != MISSING_GENOTYPE and (code >> 4 == 0 or code & 0x0F == 0) else 0 for code in range(256)
+)
+CALLED_TABLE = bytes(1 - flag for flag in NO_CALL_TABLE)
+
+
+def pack_allele_columns(first: bytes, second: bytes, dash_no_call: bool = False) -> bytes:
+    """
+    Pack two equally long columns of one-byte alleles into genotype codes.
+
+    Runs as two table lookups and one big-integer OR, so whole blocks are
+    converted without a Python-level loop. Rows with an invalid allele get
+    MISSING_GENOTYPE. With dash_no_call, '--' is read as a no-call.
+    """
+    if dash_no_call:
+        high, low = first.translate(DASH_HIGH_TABLE), second.translate(DASH_LOW_TABLE)
+    else:
+        high, low = first.translate(ALLELE_HIGH_TABLE), second.translate(ALLELE_LOW_TABLE)
+    packed = (int.from_bytes(high, 'big') | int.from_bytes(low, 'big')).to_bytes(len(high), 'big')
+    return packed.translate(DASH_FIXUP_TABLE) if dash_no_call else packed
+
+
+def rsid_to_int(rsid: str) -> Optional[int]:
+    """Return the integer part of an 'rs<digits>' id, or None for other ids."""
+    if rsid.startswith('rs') and rsid[2:].isdigit():
+        return int(rsid[2:])
+    return None
+
+
+# Vendor spellings of the sex chromosomes and mtDNA; AncestryDNA numbers
+# them 23 (X), 24 (Y), 25 (pseudoautosomal, X coordinates) and 26 (MT)
+CHROMOSOME_ALIASES = {'23': 'X', '24': 'Y', '25': 'X', '26': 'MT', 'XY': 'X', 'M': 'MT'}
+
+# Pseudoautosomal spellings, which lose to a plain X row at the same position
+PSEUDOAUTOSOMAL_CHROMOSOMES = frozenset({'25', 'XY', 'CHRXY'})
+
+
+def normalize_chromosome(name: str) -> str:
+    """Return the canonical name of a chromosome ('chr1' -> '1', '23' -> 'X')."""
+    name = name.strip().upper()
+    if name.startswith('CHR'):
+        name = name[3:]
+    return CHROMOSOME_ALIASES.get(name, name)
+
+
+class GenotypeStore(Mapping):
+    """
+    Compact, columnar store of genotypes keyed by rsid.
+
+    Columns are kept in `array` objects sorted by integer rsid and looked up
+    with binary search. Ids that are not of the form rs<digits> get negative
+    integer ids. Indexing returns a Genotype built on demand, so the store
+    can stand in for Dict[str, Genotype].
+    """
+
+    def __init__(
+        self,
+        ids: array,
+        chromosome_codes: array,
+        positions: array,
+        allele_codes: array,
+        chromosomes: List[str],
+        extra_ids: List[str]
+    ):
+        self.ids = ids
+        self.chromosome_codes = chromosome_codes
+        self.positions = positions
+        self.allele_codes = allele_codes
+        self.chromosomes = chromosomes
+        self.extra_ids = extra_ids
+        self._extra_index = {name: -(idx + 1) for idx, name in enumerate(extra_ids)}
+        self._position_index: Optional[PositionIndex] = None
+        # Set by DNAParser when only target rsids were kept
+        self.targeted = False
+
+    @property
+    def has_position_index(self) -> bool:
+        """True if the (chromosome, position) index is already built."""
+        return self._position_index is not None
+
+    def position_index(self) -> 'PositionIndex':
+        """Return the (chromosome, position) index, building it on first use."""
+        if self._position_index is None:
+            rows, spans = _position_order(self.chromosome_codes, self.positions, self.chromosomes, range(len(self)))
+            self._position_index = PositionIndex(array('i', rows), spans, self.positions)
+        return self._position_index
+
+    def key(self, rsid: str) -> Optional[int]:
+        """Return the integer id used for an rsid, or None if it cannot be stored."""
+        rsid_int = rsid_to_int(rsid)
+        if rsid_int is not None:
+            return rsid_int
+        return self._extra_index.get(rsid)
+
+    def row(self, rsid: str) -> int:
+        """Return the row index for an rsid, or -1 if not present."""
+        key = self.key(rsid)
+        if key is None:
+            return -1
+        ids = self.ids
+        idx = bisect_left(ids, key)
+        if idx < len(ids) and ids[idx] == key:
+            return idx
+        return -1
+
+    def rsid_at(self, idx: int) -> str:
+        """Return the rsid string stored at a row."""
+        key = self.ids[idx]
+        if key < 0:
+            return self.extra_ids[-key - 1]
+        return f"rs{key}"
+
+    def allele_code(self, rsid: str) -> int:
+        """Return the packed genotype code for an rsid, or MISSING_GENOTYPE."""
+        idx = self.row(rsid)
+        return self.allele_codes[idx] if idx >= 0 else MISSING_GENOTYPE
+
+    def genotype_at(self, idx: int) -> Genotype:
+        """Materialize the Genotype stored at a row."""
+        code = self.allele_codes[idx]
+        allele1 = ALLELES[code >> 4]
+        allele2 = ALLELES[code & 0x0F]
+        return Genotype(
+            rsid=self.rsid_at(idx),
+            chromosome=self.chromosomes[self.chromosome_codes[idx]],
+            position=self.positions[idx],
+            allele1=allele1,
+            allele2=allele2,
+            genotype=allele1 + allele2
+        )
+
+    def __getitem__(self, rsid: str) -> Genotype:
+        idx = self.row(rsid)
+        if idx < 0:
+            raise KeyError(rsid)
+        return self.genotype_at(idx)
+
+    def __contains__(self, rsid: object) -> bool:
+        return isinstance(rsid, str) and self.row(rsid) >= 0
+
+    def __iter__(self) -> Iterator[str]:
+        return (self.rsid_at(idx) for idx in range(len(self.ids)))
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    # Binary layout: magic, uint32 header length, JSON header, then the
+    # ids, positions, chromosome_codes, allele_codes and position index
+    # rows columns, each starting on an 8-byte boundary. The position index
+    # column is empty (and position_spans null) if the index was not built.
+    BINARY_MAGIC = b'DNAGTC01'
+
+    def write_binary(self, path: str, header: Dict[str, Any]):
+        """Write the store to a binary file that open_binary() can map back."""
+        position_index = self._position_index
+        header = dict(
+            header,
+            rows=len(self.ids),
+            byteorder=sys.byteorder,
+            chromosomes=self.chromosomes,
+            extra_ids=self.extra_ids,
+            position_spans=position_index.spans if position_index is not None else None
+        )
+        header_bytes = json.dumps(header).encode('utf-8')
+        tmp_path = f"{path}.tmp"
+
+        with open(tmp_path, 'wb') as f:
+            f.write(self.BINARY_MAGIC)
+            f.write(struct.pack('<I', len(header_bytes)))
+            f.write(header_bytes)
+            for column in (
+                self.ids, self.positions, self.chromosome_codes, self.allele_codes,
+                position_index.rows if position_index is not None else array('i')
+            ):
+                f.write(b'\0' * (-f.tell() % 8))
+                f.write(memoryview(column).cast('B'))
+
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def read_binary_header(cls, path: str) -> Optional[Dict[str, Any]]:
+        """Return the JSON header of a binary store file, or None if it is not one."""
+        with open(path, 'rb') as f:
+            if f.read(len(cls.BINARY_MAGIC)) != cls.BINARY_MAGIC:
+                return None
+            (header_len,) = struct.unpack('<I', f.read(4))
+            return json.loads(f.read(header_len).decode('utf-8'))
+
+    @classmethod
+    def open_binary(cls, path: str) -> 'GenotypeStore':
+        """Memory-map a binary store file. Columns are zero-copy views of the map."""
+        with open(path, 'rb') as f:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        view = memoryview(buffer)
+        offset = len(cls.BINARY_MAGIC)
+        (header_len,) = struct.unpack_from('<I', buffer, offset)
+        offset += 4
+        header = json.loads(bytes(view[offset:offset + header_len]).decode('utf-8'))
+        offset += header_len
+
+        rows = header['rows']
+        spans = header['position_spans']
+        columns = []
+        for typecode, itemsize, length in (
+            ('q', 8, rows), ('i', 4, rows), ('B', 1, rows), ('B', 1, rows),
+            ('i', 4, rows if spans is not None else 0)
+        ):
+            offset += -offset % 8
+            if offset + length * itemsize > len(buffer):
+                raise ValueError(f"Truncated genotype store: {path}")
+            columns.append(view[offset:offset + length * itemsize].cast(typecode))
+            offset += length * itemsize
+
+        ids, positions, chromosome_codes, allele_codes, position_rows = columns
+        store = cls(
+            ids=ids,
+            chromosome_codes=chromosome_codes,
+            positions=positions,
+            allele_codes=allele_codes,
+            chromosomes=header['chromosomes'],
+            extra_ids=header['extra_ids']
+        )
+        if spans is not None:
+            store._position_index = PositionIndex(
+                position_rows, {name: tuple(span) for name, span in spans.items()}, positions
+            )
+        store.header = header
+        store._buffer = buffer
+        return store
+
+    def without_no_calls(self) -> 'GenotypeStore':
+        """Return a copy of the store without genotypes that have a '0' allele."""
+        keep = bytes(self.allele_codes).translate(CALLED_TABLE)
+        store = GenotypeStore(
+            ids=array('q', compress(self.ids, keep)),
+            chromosome_codes=array('B', compress(self.chromosome_codes, keep)),
+            positions=array('i', compress(self.positions, keep)),
+            allele_codes=array('B', compress(self.allele_codes, keep)),
+            chromosomes=self.chromosomes,
+            extra_ids=self.extra_ids
+        )
+        store.targeted = self.targeted
+        return store
+
+
+def _take(column: Sequence, order: List[int]) -> Sequence:
+    """Return column[i] for each i in order, with the loop run by itemgetter in C."""
+    if len(order) < 2:
+        return [column[i] for i in order]
+    return operator.itemgetter(*order)(column)
+
+
+def _position_order(
+    chromosome_codes: Sequence[int],
+    positions: Sequence[int],
+    chromosomes: List[str],
+    store_rows: Sequence[int]
+) -> Tuple[List[int], Dict[str, Tuple[int, int]]]:
+    """
+    Argsort rows by (normalized chromosome, position).
+
+    Rows at the same coordinate (e.g. chromosome 23 and pseudoautosomal 25,
+    which both normalize to X) are ordered plain X first, then by store row,
+    so lookups pick the same row whichever order the rows came in.
+
+    Args:
+        store_rows: Store row of each input row, used as the tie-break.
+
+    Returns:
+        Tuple of (row order, spans), where spans maps each normalized
+        chromosome name to its [start, end) slice of the row order.
+    """
+    normalized = [normalize_chromosome(name) for name in chromosomes]
+    names = list(dict.fromkeys(normalized))
+    ranks = {name: rank for rank, name in enumerate(names)}
+    rank_table = bytes(ranks[name] for name in normalized).ljust(256, b'\0')
+    rank_column = bytes(chromosome_codes).translate(rank_table)
+    pseudoautosomal_table = bytes(
+        name.strip().upper() in PSEUDOAUTOSOMAL_CHROMOSOMES for name in chromosomes
+    ).ljust(256, b'\0')
+    pseudoautosomal_column = bytes(chromosome_codes).translate(pseudoautosomal_table)
+
+    # One integer sort key per row, unique thanks to the store row in the
+    # low bits; the bias keeps negative positions in order
+    biased = map(operator.add, positions, repeat(1 << 31))
+    keys = map(operator.or_, map(operator.lshift, rank_column, repeat(32)), biased)
+    keys = map(operator.or_, map(operator.lshift, keys, repeat(1)), pseudoautosomal_column)
+    keys = list(map(operator.or_, map(operator.lshift, keys, repeat(32)), store_rows))
+    order = sorted(range(len(keys)), key=keys.__getitem__)
+
+    counts = Counter(rank_column)
+    spans = {}
+    start = 0
+    for rank, name in enumerate(names):
+        spans[name] = (start, start + counts[rank])
+        start += counts[rank]
+    return order, spans
+
+
+class PositionIndex:
+    """
+    Rows of a GenotypeStore sorted by (chromosome, position).
+
+    `rows` lists store rows chromosome by chromosome, each run sorted by
+    position, and `spans` maps a normalized chromosome name to its run.
+    Lookups binary-search a run using the store's positions column as key,
+    so the index adds one int32 per row.
+    """
+
+    def __init__(self, rows: Sequence[int], spans: Dict[str, Tuple[int, int]], positions: Sequence[int]):
+        self.rows = rows
+        self.spans = spans
+        self.positions = positions
+
+    def lookup(self, chromosome: str, position: int) -> int:
+        """Return the store row at a coordinate, or -1 if the sample has none."""
+        span = self.spans.get(normalize_chromosome(chromosome))
+        if span is None:
+            return -1
+        start, end = span
+        rows, positions = self.rows, self.positions
+        idx = bisect_left(rows, position, start, end, key=positions.__getitem__)
+        if idx < end and positions[rows[idx]] == position:
+            return rows[idx]
+        return -1
+
+    def join(self, chromosome: str, sorted_positions: Sequence[int]) -> Iterator[Tuple[int, int]]:
+        """
+        Merge-join sorted positions against one chromosome in a single sweep.
+
+        Yields:
+            (index into sorted_positions, store row) for every position
+            present in the sample.
+        """
+        span = self.spans.get(normalize_chromosome(chromosome))
+        if span is None:
+            return
+        idx, end = span
+        rows, key = self.rows, self.positions.__getitem__
+        for pos, position in enumerate(sorted_positions):
+            # Binary search only ever moves forward, skipping the rows in between
+            idx = bisect_left(rows, position, idx, end, key=key)
+            if idx == end:
+                return
+            if key(rows[idx]) == position:
+                yield pos, rows[idx]
+
+
+class GenotypeStoreBuilder:
+    """Accumulates parsed rows in append-only columns and builds a GenotypeStore."""
+
+    def __init__(self):
+        self.ids = array('q')
+        self.chromosome_codes = array('B')
+        self.positions = array('i')
+        self.allele_codes = array('B')
+        self.chromosomes: List[str] = []
+        self.extra_ids: List[str] = []
+        self._chromosome_index: Dict[str, int] = {}
+        self._chromosome_bytes_index: Dict[bytes, int] = {}
+        self._extra_index: Dict[str, int] = {}
+        self.duplicates = 0
+
+    def _key(self, rsid: str) -> int:
+        """Return the integer id for an rsid, assigning negative ids to non-rs ids."""
+        key = rsid_to_int(rsid)
+        if key is None:
+            key = self._extra_index.get(rsid)
+            if key is None:
+                self.extra_ids.append(rsid)
+                key = self._extra_index[rsid] = -len(self.extra_ids)
+        return key
+
+    def _chromosome_code(self, chromosome: str) -> int:
+        """Return the interned code for a chromosome name."""
+        chromosome_code = self._chromosome_index.get(chromosome)
+        if chromosome_code is None:
+            chromosome_code = self._chromosome_index[chromosome] = len(self.chromosomes)
+            self.chromosomes.append(chromosome)
+        return chromosome_code
+
+    def add(self, rsid: str, chromosome: str, position: int, allele1: str, allele2: str):
+        """Append one validated row."""
+        self.ids.append(self._key(rsid))
+        self.chromosome_codes.append(self._chromosome_code(chromosome))
+        self.positions.append(position)
+        self.allele_codes.append(
+            (ALLELE_CODES[allele1.upper()] << 4) | ALLELE_CODES[allele2.upper()]
+        )
+
+    def extend(self, rsids: List[bytes], chromosomes: List[bytes], positions: List[bytes], codes: bytes):
+        """
+        Append a block of validated rows given as raw byte fields.
+
+        Every column is converted before any is appended, so a ValueError
+        (e.g. a non-numeric position) appends no rows.
+        """
+        position_column = array('i', list(map(int, positions)))
+        key_column = self._keys(rsids)
+
+        chromosome_index = self._chromosome_bytes_index
+        for chromosome in dict.fromkeys(chromosomes):
+            if chromosome not in chromosome_index:
+                chromosome_index[chromosome] = self._chromosome_code(chromosome.decode('utf-8'))
+        chromosome_column = array('B', list(map(chromosome_index.__getitem__, chromosomes)))
+
+        self.ids.extend(key_column)
+        self.chromosome_codes.extend(chromosome_column)
+        self.positions.extend(position_column)
+        self.allele_codes.frombytes(codes)
+
+    def _keys(self, rsids: List[bytes]) -> array:
+        """Convert a block of rsids to integer ids, in one pass when all are rs<digits>."""
+        joined = b'\t'.join(rsids)
+        digits = joined.replace(b'rs', b'')
+        if (
+            (b'\t' + joined).count(b'\trs') == len(rsids) == joined.count(b'rs')
+            and digits.replace(b'\t', b'').isdigit()
+            and b'\t\t' not in b'\t' + digits + b'\t'
+        ):
+            return array('q', list(map(int, digits.split(b'\t'))))
+        return array('q', [self._key(rsid.decode('utf-8')) for rsid in rsids])
+
+    def build(self, position_index: bool = False) -> GenotypeStore:
+        """
+        Sort rows by id and return the store. Later duplicates win, as with a dict.
+
+        Args:
+            position_index: Also build the store's (chromosome, position)
+                index. Otherwise it is built on first position_index() call.
+        """
+        ids = self.ids
+        if all(map(operator.lt, ids, islice(ids, 1, None))):
+            # Already in id order without duplicates, e.g. a re-sorted export
+            order: Sequence[int] = range(len(ids))
+            self.duplicates = 0
+            store = GenotypeStore(
+                ids=array('q', ids),
+                chromosome_codes=array('B', self.chromosome_codes),
+                positions=array('i', self.positions),
+                allele_codes=array('B', self.allele_codes),
+                chromosomes=self.chromosomes,
+                extra_ids=self.extra_ids
+            )
+        else:
+            # Sort keys are fetched faster from a list than from the array
+            order = sorted(range(len(ids)), key=ids.tolist().__getitem__)
+            keys = _take(ids, order)
+
+            # Keep only the last occurrence of each id (the sort is stable)
+            if any(map(operator.eq, keys, islice(keys, 1, None))):
+                order = [
+                    row for pos, row in enumerate(order)
+                    if pos + 1 == len(order) or keys[pos + 1] != keys[pos]
+                ]
+                keys = _take(ids, order)
+            self.duplicates = len(ids) - len(order)
+
+            # Byte columns are gathered from bytes, which skips creating ints
+            store = GenotypeStore(
+                ids=array('q', keys),
+                chromosome_codes=array('B', bytes(_take(bytes(self.chromosome_codes), order))),
+                positions=array('i', _take(self.positions, order)),
+                allele_codes=array('B', bytes(_take(bytes(self.allele_codes), order))),
+                chromosomes=self.chromosomes,
+                extra_ids=self.extra_ids
+            )
+
+        # Raw files list rows in coordinate order, so sorting by position is
+        # cheapest here, before the rows are reordered by rsid. With
+        # duplicates the store builds the index from its own rows instead.
+        if position_index and not self.duplicates:
+            store_rows = array('i', bytes(4 * len(order)))
+            for store_row, row in enumerate(order):
+                store_rows[row] = store_row
+            position_order, spans = _position_order(
+                self.chromosome_codes, self.positions, self.chromosomes, store_rows
+            )
+            store._position_index = PositionIndex(
+                array('i', _take(store_rows, position_order)), spans, store.positions
+            )
+        return store
+
+
 # ============================================================================
 # DNA Parser Module
 # ============================================================================
 
-class DNAParser:
-    """Parses Ancestry.com raw DNA files."""
+# Compressed inputs are recognised by their leading bytes, not their names.
+# bgzip files are ordinary multi-member gzip streams.
+GZIP_MAGIC = b'\x1f\x8b'
+ZIP_MAGIC = b'PK\x03\x04'
+COMPRESSED_SUFFIXES = ('.gz', '.bgz', '.zip')
 
-    def __init__(self, file_path: str):
-        self.file_path = file_path
+# Read size for raw data streams, so decompression runs in large chunks
+RAW_READ_SIZE = 1 << 20
+
+
+def detect_compression(path: str) -> Optional[str]:
+    """Return 'gzip', 'zip' or None from the first bytes of a file."""
+    with open(path, 'rb') as f:
+        magic = f.read(4)
+    if magic.startswith(GZIP_MAGIC):
+        return 'gzip'
+    if magic == ZIP_MAGIC:
+        return 'zip'
+    return None
+
+
+def _zip_data_member(archive: zipfile.ZipFile) -> zipfile.ZipInfo:
+    """Pick the raw data file inside a vendor zip: the largest regular file."""
+    members = [
+        info for info in archive.infolist()
+        if not info.is_dir() and not info.filename.startswith('__MACOSX/')
+    ]
+    if not members:
+        raise ValueError(f"No data file in zip archive: {archive.filename}")
+    return max(members, key=lambda info: info.file_size)
+
+
+@contextmanager
+def open_raw_data(path: str) -> Iterator[Tuple[BinaryIO, BinaryIO]]:
+    """
+    Open a raw data file as a binary stream, decoding gzip, bgzip and zip.
+
+    Yields:
+        (stream, source) where stream reads the decompressed data in
+        RAW_READ_SIZE chunks and source is the file on disk, whose tell()
+        counts the (compressed) bytes read so far.
+    """
+    compression = detect_compression(path)
+    with open(path, 'rb', buffering=RAW_READ_SIZE) as source:
+        if compression == 'gzip':
+            with gzip.GzipFile(fileobj=source, mode='rb') as decoded:
+                yield io.BufferedReader(decoded, buffer_size=RAW_READ_SIZE), source
+        elif compression == 'zip':
+            with zipfile.ZipFile(source) as archive:
+                member = _zip_data_member(archive)
+                with archive.open(member) as decoded:
+                    yield io.BufferedReader(decoded, buffer_size=RAW_READ_SIZE), source
+        else:
+            yield source, source
+
+
+# A parsed data row: (rsid, chromosome, position, allele1, allele2)
+RawRow = Tuple[str, str, int, str, str]
+
+# A block of rows split in bulk: rsid, chromosome and position byte fields
+# plus packed genotype codes (MISSING_GENOTYPE where alleles are invalid)
+ChunkColumns = Tuple[List[bytes], List[bytes], List[bytes], bytes]
+
+
+class RawDataReader:
+    """
+    Base class for one vendor's raw-data layout.
+
+    A reader recognises its format from the first lines of a file and turns
+    each data line into a RawRow. Readers are stateless and line-oriented,
+    so the parser can stream any registered format the same way.
+    """
+
+    name = ''
+
+    @classmethod
+    def sniff(cls, head: List[str]) -> bool:
+        """Return True if the first lines of a file look like this format."""
+        raise NotImplementedError
+
+    def is_header(self, line: str) -> bool:
+        """Return True for comment and column-header lines before the data."""
+        return line.startswith('#')
+
+    def row_id(self, line: str) -> str:
+        """Return the rsid of a data line without parsing the rest of it."""
+        return line[:line.find('\t')]
+
+    def parse_line(self, line: str) -> Optional[RawRow]:
+        """Parse a stripped data line, or return None if it holds no genotype."""
+        raise NotImplementedError
+
+    def split_chunk(self, chunk: bytes) -> Optional[ChunkColumns]:
+        """
+        Split a block of '\n'-terminated data lines into columns in bulk.
+
+        Returns None when the block needs the line-by-line path: the format
+        has no bulk splitter, or a row is irregular (wrong field count,
+        stray whitespace, multi-letter alleles).
+        """
+        return None
+
+    @staticmethod
+    def _split_fields(chunk: bytes, delimiter: bytes, width: int) -> Optional[List[bytes]]:
+        """Split a block whose lines all have exactly `width` fields into one flat list."""
+        if b' ' in chunk:
+            return None
+        lines = chunk[:-1].split(b'\n')
+        if set(map(bytes.count, lines, repeat(delimiter))) != {width - 1}:
+            return None
+        return delimiter.join(lines).split(delimiter)
+
+    @staticmethod
+    def _pack_genotypes(genotypes: List[bytes]) -> Optional[bytes]:
+        """Pack a column of combined genotypes ('AG', '--' or haploid 'A') in bulk."""
+        lengths = set(map(len, genotypes))
+        if not lengths <= {1, 2}:
+            return None
+        if 1 in lengths:
+            # A lone '-' is not a no-call; '!' keeps it invalid after doubling
+            genotypes = [
+                (b'!!' if genotype == b'-' else genotype * 2) if len(genotype) == 1 else genotype
+                for genotype in genotypes
+            ]
+        joined = b''.join(genotypes)
+        return pack_allele_columns(joined[0::2], joined[1::2], dash_no_call=True)
+
+    @staticmethod
+    def _first_data_line(head: List[str]) -> str:
+        """Return the first non-empty, non-comment line of head."""
+        for line in head:
+            line = line.strip()
+            if line and not line.startswith('#'):
+                return line
+        return ''
+
+    @staticmethod
+    def _split_genotype(genotype: str) -> Optional[Tuple[str, str]]:
+        """Split a combined genotype such as 'AG', '--' or a haploid 'A'."""
+        if genotype == '--':
+            return '0', '0'
+        if len(genotype) == 2:
+            return genotype[0], genotype[1]
+        if len(genotype) == 1:
+            return genotype, genotype
+        return None
+
+
+RAW_DATA_READERS: List[type] = []
+
+
+def register_reader(reader_cls: type) -> type:
+    """Class decorator adding a RawDataReader to the sniffing registry."""
+    RAW_DATA_READERS.append(reader_cls)
+    return reader_cls
+
+
+def reader_for_format(name: str) -> RawDataReader:
+    """Return a reader instance by format name."""
+    for reader_cls in RAW_DATA_READERS:
+        if reader_cls.name == name:
+            return reader_cls()
+    raise ValueError(f"Unknown raw data format: {name}")
+
+
+def sniff_reader(head: List[str]) -> RawDataReader:
+    """
+    Pick the reader for a file from its first lines.
+
+    Readers are tried in registration order. Files nothing recognises fall
+    back to the AncestryDNA layout, which is what the parser always assumed.
+    """
+    for reader_cls in RAW_DATA_READERS:
+        if reader_cls.sniff(head):
+            return reader_cls()
+    return AncestryReader()
+
+
+@register_reader
+class VCFReader(RawDataReader):
+    """
+    Single-sample VCF. Only the first sample column is read, rows without an
+    rs id are skipped, and a 'chr' prefix is dropped from chromosome names.
+    """
+
+    name = 'vcf'
+
+    @classmethod
+    def sniff(cls, head: List[str]) -> bool:
+        return any(line.startswith(('##fileformat=VCF', '#CHROM')) for line in head)
+
+    def row_id(self, line: str) -> str:
+        parts = line.split('\t', 3)
+        return parts[2].split(';', 1)[0] if len(parts) > 2 else ''
+
+    def parse_line(self, line: str) -> Optional[RawRow]:
+        parts = line.split('\t')
+        if len(parts) < 10:
+            return None
+
+        chromosome, position, ids, ref, alt = parts[:5]
+        rsid = ids.split(';', 1)[0]
+        if not rsid.startswith('rs'):
+            return None
+
+        formats = parts[8].split(':')
+        if 'GT' not in formats:
+            return None
+        values = parts[9].split(':')
+        gt_idx = formats.index('GT')
+        if gt_idx >= len(values):
+            return None
+
+        calls = values[gt_idx].replace('|', '/').split('/')
+        if len(calls) == 1:
+            calls = calls * 2
+        if len(calls) != 2:
+            return None
+
+        alleles = [ref] + alt.split(',')
+        genotype = []
+        for call in calls:
+            if call == '.':
+                genotype.append('0')
+            elif call.isdigit() and int(call) < len(alleles):
+                genotype.append(alleles[int(call)])
+            else:
+                return None
+
+        if chromosome.startswith('chr'):
+            chromosome = chromosome[3:]
+        return rsid, chromosome, int(position), genotype[0], genotype[1]
+
+
+@register_reader
+class CSVReader(RawDataReader):
+    """MyHeritage and FamilyTreeDNA CSV: RSID,CHROMOSOME,POSITION,RESULT with quoted fields."""
+
+    name = 'csv'
+
+    @classmethod
+    def sniff(cls, head: List[str]) -> bool:
+        line = cls._first_data_line(head)
+        return '\t' not in line and line.count(',') == 3
+
+    def is_header(self, line: str) -> bool:
+        return line.startswith('#') or line.lstrip('"').upper().startswith('RSID')
+
+    def row_id(self, line: str) -> str:
+        return line[:line.find(',')].strip('"')
+
+    def parse_line(self, line: str) -> Optional[RawRow]:
+        parts = line.replace('"', '').split(',')
+        if len(parts) < 4:
+            return None
+        alleles = self._split_genotype(parts[3])
+        if alleles is None:
+            return None
+        return parts[0], parts[1], int(parts[2]), alleles[0], alleles[1]
+
+    def split_chunk(self, chunk: bytes) -> Optional[ChunkColumns]:
+        fields = self._split_fields(chunk.replace(b'"', b''), b',', 4)
+        if fields is None:
+            return None
+        codes = self._pack_genotypes(fields[3::4])
+        if codes is None:
+            return None
+        return fields[0::4], fields[1::4], fields[2::4], codes
+
+
+@register_reader
+class TwentyThreeAndMeReader(RawDataReader):
+    """23andMe: rsid, chromosome, position and a combined genotype column."""
+
+    name = '23andme'
+
+    @classmethod
+    def sniff(cls, head: List[str]) -> bool:
+        if any(line.startswith('#') and '23andMe' in line for line in head):
+            return True
+        return len(cls._first_data_line(head).split('\t')) == 4
+
+    def parse_line(self, line: str) -> Optional[RawRow]:
+        parts = line.split('\t')
+        if len(parts) < 4:
+            return None
+        alleles = self._split_genotype(parts[3])
+        if alleles is None:
+            return None
+        return parts[0], parts[1], int(parts[2]), alleles[0], alleles[1]
+
+    def split_chunk(self, chunk: bytes) -> Optional[ChunkColumns]:
+        fields = self._split_fields(chunk, b'\t', 4)
+        if fields is None:
+            return None
+        codes = self._pack_genotypes(fields[3::4])
+        if codes is None:
+            return None
+        return fields[0::4], fields[1::4], fields[2::4], codes
+
+
+@register_reader
+class AncestryReader(RawDataReader):
+    """AncestryDNA: rsid, chromosome, position, allele1, allele2."""
+
+    name = 'ancestry'
+
+    @classmethod
+    def sniff(cls, head: List[str]) -> bool:
+        if any(line.startswith('#') and 'AncestryDNA' in line for line in head):
+            return True
+        return len(cls._first_data_line(head).split('\t')) == 5
+
+    def is_header(self, line: str) -> bool:
+        return line.startswith('#') or line.startswith('rsid')
+
+    def parse_line(self, line: str) -> Optional[RawRow]:
+        parts = line.split('\t')
+        if len(parts) < 5:
+            return None
+        rsid, chromosome, position, allele1, allele2 = parts[:5]
+        return rsid, chromosome, int(position), allele1, allele2
+
+    def split_chunk(self, chunk: bytes) -> Optional[ChunkColumns]:
+        fields = self._split_fields(chunk, b'\t', 5)
+        if fields is None:
+            return None
+        first, second = fields[3::5], fields[4::5]
+        if set(map(len, first)) != {1} or set(map(len, second)) != {1}:
+            return None
+        return fields[0::5], fields[1::5], fields[2::5], pack_allele_columns(b''.join(first), b''.join(second))
+
+
+@dataclass
+class ParseStats:
+    """
+    Parse-quality counters for one raw DNA file.
+
+    Rejections and duplicates are counted while the file streams; genotype
+    and no-call counts are taken from the finished store. In targeted
+    mode they cover only the rows that were parsed.
+    """
+    genotypes: int = 0
+    no_calls: int = 0
+    duplicates: int = 0
+    rejected: Dict[str, int] = field(default_factory=dict)
+    genotypes_by_chromosome: Dict[str, int] = field(default_factory=dict)
+    no_calls_by_chromosome: Dict[str, int] = field(default_factory=dict)
+
+    # Rejection reasons
+    MALFORMED = 'malformed_row'
+    INVALID_ALLELE = 'invalid_allele'
+
+    @property
+    def call_rate(self) -> float:
+        """Fraction of genotypes with both alleles called."""
+        if self.genotypes == 0:
+            return 0.0
+        return 1 - self.no_calls / self.genotypes
+
+    def reject(self, reason: str, count: int = 1):
+        """Count rows dropped for a reason."""
+        if count:
+            self.rejected[reason] = self.rejected.get(reason, 0) + count
+
+    def count_genotypes(self, genotypes: GenotypeStore):
+        """Fill the genotype and no-call counts from a finished store."""
+        names = genotypes.chromosomes
+        no_call_flags = bytes(genotypes.allele_codes).translate(NO_CALL_TABLE)
+        by_chromosome = Counter(genotypes.chromosome_codes)
+        no_calls = Counter(compress(genotypes.chromosome_codes, no_call_flags))
+
+        self.genotypes = len(genotypes)
+        self.no_calls = sum(no_calls.values())
+        self.genotypes_by_chromosome = {names[code]: count for code, count in sorted(by_chromosome.items())}
+        self.no_calls_by_chromosome = {names[code]: count for code, count in sorted(no_calls.items())}
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Return the counters, plus the call rate, as plain data."""
+        return dict(
+            genotypes=self.genotypes,
+            no_calls=self.no_calls,
+            call_rate=self.call_rate,
+            duplicates=self.duplicates,
+            rejected=dict(self.rejected),
+            genotypes_by_chromosome=dict(self.genotypes_by_chromosome),
+            no_calls_by_chromosome=dict(self.no_calls_by_chromosome)
+        )
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'ParseStats':
+        """Rebuild stats saved with to_dict()."""
+        return cls(
+            genotypes=data['genotypes'],
+            no_calls=data['no_calls'],
+            duplicates=data['duplicates'],
+            rejected=data['rejected'],
+            genotypes_by_chromosome=data['genotypes_by_chromosome'],
+            no_calls_by_chromosome=data['no_calls_by_chromosome']
+        )
 
-    def parse(self) -> Dict[str, Genotype]:
+
+class DNAParser:
+    """
+    Parses raw DNA files from AncestryDNA, 23andMe, MyHeritage, FamilyTreeDNA
+    and single-sample VCF. The format is sniffed from the first lines.
+    """
+
+    CACHE_SUFFIX = '.gtcache'
+    CACHE_VERSION = 5
+    SNIFF_LINES = 64
+    CHUNK_SIZE = 1 << 22
+    MIN_BULK_SIZE = 1 << 16
+
+    def __init__(
+        self,
+        file_path: str,
+        target_rsids: Optional[Set[str]] = None,
+        use_cache: bool = False,
+        file_format: Optional[str] = None,
+        exclude_no_calls: bool = False,
+        position_index: bool = False
+    ):
+        """
+        Args:
+            file_path: Path to the raw DNA file.
+            target_rsids: Optional set of rsids to extract. When given, only
+                rows for these rsids become Genotype objects and parsing
+                stops as soon as every target has been seen.
+            use_cache: Read and write a binary sidecar cache next to the
+                source file. The cache always holds every genotype, so
+                target_rsids is ignored when the cache is in use.
+            file_format: Reader name ('ancestry', '23andme', 'csv' or
+                'vcf'). Sniffed from the file when not given.
+            exclude_no_calls: Drop genotypes with a '0' allele from the
+                returned store so they are never matched. They are still
+                counted in `stats` (and kept in the cache).
+            position_index: Build the (chromosome, position) index that
+                VariantMatcher position_match needs, and keep it in the
+                cache. The fallback looks for rows whose rsid is not in the
+                catalog, so target_rsids is ignored.
         """
-        Parse Ancestry.com raw DNA file and extract genotype data.
+        self.file_path = file_path
+        self.target_rsids = set(target_rsids) if target_rsids is not None else None
+        self.use_cache = use_cache
+        self.cache_path = file_path + self.CACHE_SUFFIX
+        self.file_format = file_format
+        self.exclude_no_calls = exclude_no_calls
+        self.position_index = position_index
+        self.stats = ParseStats()
+        self.lines_read = 0
+        self.bytes_read = 0
+
+    def parse(self) -> GenotypeStore:
+        """
+        Parse the raw DNA file and extract genotype data.
+
+        When the sidecar cache is enabled and still matches the source file,
+        the genotypes are memory-mapped from it instead of parsed. Parse
+        quality counters end up in `stats` either way.
 
         Returns:
-            Dictionary mapping rsids to Genotype objects.
+            GenotypeStore mapping rsids to Genotype objects.
         """
-        genotypes = {}
-        line_number = 0
-        header_skipped = False
+        if not self.use_cache:
+            genotypes = self._parse_text(None if self.position_index else self.target_rsids)
+        else:
+            genotypes = self._load_cache()
+            if genotypes is not None:
+                logger.info("Loaded %d genotypes from cache: %s", len(genotypes), self.cache_path)
+                if self.position_index and not genotypes.has_position_index:
+                    genotypes.position_index()
+                    self._write_cache(genotypes)
+            else:
+                genotypes = self._parse_text(None)
+                self._write_cache(genotypes)
+
+        self._log_stats()
+        if self.exclude_no_calls and self.stats.no_calls:
+            genotypes = genotypes.without_no_calls()
+            logger.info("Excluded %d no-call genotypes from matching", self.stats.no_calls)
+        return genotypes
 
-        print(f"Parsing DNA file: {self.file_path}")
+    def _log_stats(self):
+        """Log the call rate, rejected rows and duplicates of the last parse."""
+        stats = self.stats
+        logger.info(
+            "Call rate: %.2f%% (%d no-calls in %d genotypes)",
+            stats.call_rate * 100, stats.no_calls, stats.genotypes
+        )
+        if stats.rejected:
+            logger.info(
+                "Rejected rows: %s",
+                ', '.join(f"{reason} {count}" for reason, count in sorted(stats.rejected.items()))
+            )
+        if stats.duplicates:
+            logger.info("Duplicate rsids: %d (last occurrence kept)", stats.duplicates)
+        for chromosome, count in stats.genotypes_by_chromosome.items():
+            logger.debug(
+                "Chromosome %s: %d genotypes, %d no-calls",
+                chromosome, count, stats.no_calls_by_chromosome.get(chromosome, 0)
+            )
 
+    def _source_info(self) -> Tuple[int, int]:
+        """Return (size, mtime_ns) of the source file."""
+        stat = os.stat(self.file_path)
+        return stat.st_size, stat.st_mtime_ns
+
+    def _source_hash(self) -> str:
+        """Return the SHA-256 of the source file."""
+        digest = hashlib.sha256()
+        with open(self.file_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    def _load_cache(self) -> Optional[GenotypeStore]:
+        """Return the cached store if the sidecar is valid for the current source."""
         try:
-            with open(self.file_path, 'r', encoding='utf-8') as f:
-                for line in f:
-                    line_number += 1
-                    line = line.strip()
+            header = GenotypeStore.read_binary_header(self.cache_path)
+            size, mtime_ns = self._source_info()
+        except (OSError, ValueError, struct.error):
+            return None
+
+        if (
+            header is None
+            or header.get('version') != self.CACHE_VERSION
+            or header.get('byteorder') != sys.byteorder
+            or header.get('source_size') != size
+        ):
+            return None
 
-                    # Skip header lines
-                    if not header_skipped:
-                        if line.startswith('#') or line.startswith('rsid'):
-                            continue
-                        else:
-                            header_skipped = True
+        try:
+            genotypes = GenotypeStore.open_binary(self.cache_path)
+            self.stats = ParseStats.from_dict(header['parse_stats'])
+        except (OSError, ValueError, TypeError, KeyError):
+            return None
 
-                    # Skip empty lines
-                    if not line:
-                        continue
+        if header.get('source_mtime_ns') != mtime_ns:
+            # Touched or copied, but possibly unchanged: fall back to the hash
+            if header.get('source_sha256') != self._source_hash():
+                return None
+            self._write_cache(genotypes)
 
-                    # Parse data line
-                    parts = line.split('\t')
-                    if len(parts) < 5:
-                        continue
+        return genotypes
 
-                    rsid, chromosome, position, allele1, allele2 = parts[:5]
+    def _write_cache(self, genotypes: GenotypeStore):
+        """Write the sidecar cache for the current source file."""
+        size, mtime_ns = self._source_info()
+        header = {
+            'version': self.CACHE_VERSION,
+            'source_size': size,
+            'source_mtime_ns': mtime_ns,
+            'source_sha256': self._source_hash(),
+            'parse_stats': self.stats.to_dict()
+        }
+        try:
+            genotypes.write_binary(self.cache_path, header)
+        except OSError as e:
+            logger.warning("Could not write DNA cache %s: %s", self.cache_path, e)
 
-                    # Validate alleles
-                    if not self._validate_allele(allele1) or not self._validate_allele(allele2):
-                        continue
+    def _parse_text(self, target_rsids: Optional[Set[str]]) -> GenotypeStore:
+        """
+        Parse the raw text file, optionally keeping only target_rsids.
 
-                    # Create genotype
-                    genotype = Genotype(
-                        rsid=rsid,
-                        chromosome=chromosome,
-                        position=int(position),
-                        allele1=allele1,
-                        allele2=allele2,
-                        genotype=allele1 + allele2
-                    )
+        The file is read in CHUNK_SIZE blocks of whole lines. Full parses
+        split each block into columns in bulk when the reader supports it;
+        targeted parses and irregular blocks go line by line.
+        """
+        builder = GenotypeStoreBuilder()
+        remaining = set(target_rsids) if target_rsids is not None else None
+        self.stats = ParseStats()
+        self.lines_read = 0
+
+        logger.info("Parsing DNA file: %s", self.file_path)
+        if remaining is not None:
+            logger.info("Targeted mode: looking for %d rsids", len(remaining))
+
+        try:
+            with open_raw_data(self.file_path) as (stream, source):
+                chunks = self._chunks(stream)
+                chunk = next(chunks, b'')
+                head = chunk.split(b'\n', self.SNIFF_LINES)[:self.SNIFF_LINES]
+                if self.file_format is not None:
+                    reader = reader_for_format(self.file_format)
+                else:
+                    reader = sniff_reader([line.decode('utf-8') for line in head])
+                self.file_format = reader.name
+                logger.info("Detected %s format", reader.name)
+
+                header_skipped = False
+                while chunk:
+                    # Skip header lines
+                    if not header_skipped:
+                        offset = self._skip_header(chunk, reader)
+                        if offset is None:
+                            chunk = next(chunks, b'')
+                            continue
+                        chunk = chunk[offset:]
+                        header_skipped = True
+
+                    # Targeted runs keep the line parser: its rsid prefilter
+                    # is cheaper than splitting every row of the block
+                    if remaining is None:
+                        self._parse_chunk(chunk, reader, builder)
+                    elif self._parse_lines(chunk, reader, builder, remaining):
+                        logger.info("All targeted rsids found by line %d, stopping early", self.lines_read)
+                        break
+                    chunk = next(chunks, b'')
 
-                    genotypes[rsid] = genotype
+                self.bytes_read = source.tell()
 
         except FileNotFoundError:
-            print(f"Error: DNA file not found: {self.file_path}")
+            logger.error("DNA file not found: %s", self.file_path)
             sys.exit(1)
         except Exception as e:
-            print(f"Error parsing DNA file at line {line_number}: {e}")
+            logger.error("Error parsing DNA file at line %d: %s", self.lines_read, e)
             sys.exit(1)
 
-        print(f"Parsed {len(genotypes)} genotypes from DNA file")
+        genotypes = builder.build(self.position_index)
+        genotypes.targeted = remaining is not None
+        self.stats.duplicates = builder.duplicates
+        self.stats.count_genotypes(genotypes)
+        if remaining is not None:
+            logger.info("Parsed %d of %d targeted genotypes from DNA file", len(genotypes), len(target_rsids))
+        else:
+            logger.info("Parsed %d genotypes from DNA file", len(genotypes))
         return genotypes
 
+    def _chunks(self, stream: BinaryIO) -> Iterator[bytes]:
+        """Yield the stream in blocks of whole lines, with line endings normalised to '\\n'."""
+        pending = b''
+        while True:
+            data = stream.read(self.CHUNK_SIZE)
+            if not data:
+                if pending:
+                    yield pending.replace(b'\r', b'') + b'\n'
+                return
+            data = pending + data
+            cut = data.rfind(b'\n') + 1
+            pending = data[cut:]
+            if cut:
+                yield data[:cut].replace(b'\r', b'')
+
+    def _skip_header(self, chunk: bytes, reader: RawDataReader) -> Optional[int]:
+        """Return the offset of the first data line in chunk, or None if it is all header."""
+        offset = 0
+        while offset < len(chunk):
+            end = chunk.index(b'\n', offset)
+            if not reader.is_header(chunk[offset:end].decode('utf-8').strip()):
+                return offset
+            self.lines_read += 1
+            offset = end + 1
+        return None
+
+    def _parse_chunk(self, chunk: bytes, reader: RawDataReader, builder: GenotypeStoreBuilder):
+        """
+        Parse one block of data lines, in bulk when possible.
+
+        Irregular blocks are halved until the odd rows are isolated, and the
+        remaining small blocks go through the line parser, which applies the
+        same skip rules and reports the exact line of an error.
+        """
+        try:
+            columns = reader.split_chunk(chunk)
+            if columns is not None:
+                rsids, chromosomes, positions, codes = columns
+                lines = len(codes)
+                invalid = codes.count(MISSING_GENOTYPE)
+
+                # Drop rows with invalid alleles
+                if invalid:
+                    keep = list(map(operator.ne, codes, repeat(MISSING_GENOTYPE)))
+                    rsids = list(compress(rsids, keep))
+                    chromosomes = list(compress(chromosomes, keep))
+                    positions = list(compress(positions, keep))
+                    codes = bytes(compress(codes, keep))
+
+                builder.extend(rsids, chromosomes, positions, codes)
+                self.stats.reject(ParseStats.INVALID_ALLELE, invalid)
+                self.lines_read += lines
+                return
+        except (ValueError, OverflowError, UnicodeDecodeError):
+            pass
+
+        if len(chunk) > self.MIN_BULK_SIZE:
+            middle = chunk.find(b'\n', len(chunk) // 2) + 1
+            if 0 < middle < len(chunk):
+                self._parse_chunk(chunk[:middle], reader, builder)
+                self._parse_chunk(chunk[middle:], reader, builder)
+                return
+
+        self._parse_lines(chunk, reader, builder, None)
+
+    def _parse_lines(
+        self,
+        chunk: bytes,
+        reader: RawDataReader,
+        builder: GenotypeStoreBuilder,
+        remaining: Optional[Set[str]]
+    ) -> bool:
+        """Parse one block line by line. Returns True once every target has been seen."""
+        for line in chunk.decode('utf-8').split('\n')[:-1]:
+            self.lines_read += 1
+            line = line.strip()
+
+            # Skip empty lines
+            if not line:
+                continue
+
+            # Skip rows nobody asked for before doing any real work
+            if remaining is not None and reader.row_id(line) not in remaining:
+                continue
+
+            # Parse data line
+            row = reader.parse_line(line)
+            if row is None:
+                self.stats.reject(ParseStats.MALFORMED)
+                continue
+
+            rsid, chromosome, position, allele1, allele2 = row
+
+            # Validate alleles
+            if not self._validate_allele(allele1) or not self._validate_allele(allele2):
+                self.stats.reject(ParseStats.INVALID_ALLELE)
+                continue
+
+            builder.add(rsid, chromosome, position, allele1, allele2)
+
+            # Stop once every target has been seen
+            if remaining is not None:
+                remaining.discard(rsid)
+                if not remaining:
+                    return True
+
+        return False
+
     def _validate_allele(self, allele: str) -> bool:
         """Validate allele format (A, T, C, G, or 0 for missing)."""
-        valid_alleles = {'A', 'T', 'C', 'G', '0'}
-        return allele.upper() in valid_alleles
+        return allele in VALID_ALLELES
 
 
 # ============================================================================
 # Gene Catalog Loader
 # ============================================================================
 
+# libyaml's C loader is several times faster than the pure-Python one
+YAML_LOADER = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+
+
+def _parse_gene_files(paths: List[str]) -> List[Tuple[Optional['Gene'], Optional[str], Optional[str]]]:
+    """
+    Parse a chunk of gene YAML files. Runs in catalog loader worker processes.
+
+    Returns:
+        One (gene, sha256, error) tuple per path, in input order.
+    """
+    results = []
+    for path in paths:
+        try:
+            with open(path, 'rb') as f:
+                content = f.read()
+            gene = GeneCatalogLoader._parse_gene_content(content)
+            results.append((gene, hashlib.sha256(content).hexdigest(), None))
+        except Exception as e:
+            results.append((None, None, str(e)))
+    return results
+
+
 class GeneCatalogLoader:
     """Loads and parses gene catalog YAML files."""
 
-    def __init__(self, catalog_path: str):
+    SNAPSHOT_NAME = '.gene-catalog.snapshot'
+    SNAPSHOT_VERSION = 3
+
+    def __init__(
+        self,
+        catalog_path: str,
+        use_snapshot: bool = False,
+        snapshot_path: Optional[str] = None,
+        workers: int = 1,
+        database: Optional['ResultDatabase'] = None
+    ):
+        """
+        Args:
+            catalog_path: Root directory of the YAML gene catalog.
+            use_snapshot: Read and update a compiled snapshot of the catalog
+                so that only YAML files that changed are parsed again.
+            snapshot_path: Snapshot location; defaults to SNAPSHOT_NAME
+                inside the catalog directory.
+            workers: Number of processes used to parse YAML files. Values
+                above 1 parse in chunks on a ProcessPoolExecutor.
+            database: Optional results database that receives the loaded
+                genes and variants.
+        """
         self.catalog_path = catalog_path
+        self.use_snapshot = use_snapshot
+        self.snapshot_path = snapshot_path or os.path.join(catalog_path, self.SNAPSHOT_NAME)
+        self.workers = max(1, workers)
+        self.database = database
+        self.files_parsed = 0
+        self.bytes_read = 0
+        self.gene_hashes: List[str] = []
 
     def load(self) -> List[Gene]:
         """
         Load all YAML files from gene catalog.
 
+        With the snapshot enabled, genes for files whose size and mtime (or,
+        failing that, SHA-256) match the snapshot manifest are taken from the
+        snapshot, and only new or changed files are parsed.
+
+        The SHA-256 of each gene's YAML file is left in `gene_hashes`,
+        aligned with the returned list.
+
         Returns:
             List of Gene objects.
         """
         genes = []
+        self.gene_hashes = []
         catalog_dir = Path(self.catalog_path)
 
         if not catalog_dir.exists():
-            print(f"Error: Gene catalog directory not found: {self.catalog_path}")
+            logger.error("Gene catalog directory not found: %s", self.catalog_path)
             sys.exit(1)
 
-        print(f"Loading gene catalog from: {self.catalog_path}")
+        logger.info("Loading gene catalog from: %s", self.catalog_path)
 
         # Walk through all YAML files
         yaml_files = list(catalog_dir.rglob('*.yaml'))
-        print(f"Found {len(yaml_files)} YAML files")
+        logger.info("Found %d YAML files", len(yaml_files))
+
+        snapshot = self._read_snapshot() if self.use_snapshot else None
+        old_manifest = snapshot['manifest'] if snapshot else {}
+        old_genes = snapshot['genes'] if snapshot else {}
+        manifest: Dict[str, Dict[str, Any]] = {}
+        snapshot_genes: Dict[str, Gene] = {}
+
+        # Take unchanged files from the snapshot, queue the rest for parsing
+        outcomes: Dict[Path, Tuple[Optional[Gene], Optional[str], Optional[str]]] = {}
+        stats: Dict[Path, os.stat_result] = {}
+        pending: List[Path] = []
+        reused = 0
 
         for yaml_file in yaml_files:
+            key = yaml_file.relative_to(catalog_dir).as_posix()
             try:
-                gene = self._parse_gene_file(yaml_file)
-                if gene:
-                    genes.append(gene)
+                stat = stats[yaml_file] = yaml_file.stat()
+                entry = old_manifest.get(key)
+
+                if entry is not None and entry['size'] == stat.st_size and key in old_genes:
+                    if (
+                        entry['mtime_ns'] == stat.st_mtime_ns
+                        or hashlib.sha256(yaml_file.read_bytes()).hexdigest() == entry['sha256']
+                    ):
+                        outcomes[yaml_file] = (old_genes[key], entry['sha256'], None)
+                        reused += 1
+                        continue
+
+                pending.append(yaml_file)
             except Exception as e:
-                print(f"Warning: Error parsing {yaml_file}: {e}")
+                outcomes[yaml_file] = (None, None, str(e))
+
+        for yaml_file, outcome in zip(pending, self._parse_files(pending)):
+            outcomes[yaml_file] = outcome
+        self.files_parsed = len(pending)
+        self.bytes_read = sum(stats[yaml_file].st_size for yaml_file in pending)
+
+        for yaml_file in yaml_files:
+            gene, sha256, error = outcomes[yaml_file]
+            if error is not None:
+                logger.warning("Error parsing %s: %s", yaml_file, error)
                 continue
 
-        print(f"Loaded {len(genes)} genes from catalog")
+            if gene:
+                stat = stats[yaml_file]
+                key = yaml_file.relative_to(catalog_dir).as_posix()
+                genes.append(gene)
+                self.gene_hashes.append(sha256)
+                snapshot_genes[key] = gene
+                manifest[key] = {
+                    'mtime_ns': stat.st_mtime_ns,
+                    'size': stat.st_size,
+                    'sha256': sha256
+                }
+
+        if self.use_snapshot:
+            logger.info("Reused %d genes from snapshot, parsed %d YAML files", reused, len(pending))
+            if manifest != old_manifest:
+                self._write_snapshot(manifest, snapshot_genes)
+
+        logger.info("Loaded %d genes from catalog", len(genes))
+        if self.database is not None:
+            try:
+                self.database.write_catalog(genes, self.gene_hashes)
+            except ValueError as e:
+                logger.error("Cannot store catalog in database %s: %s", self.database.path, e)
+                sys.exit(1)
         return genes
 
-    def _parse_gene_file(self, yaml_file: Path) -> Optional[Gene]:
-        """Parse a single gene YAML file."""
-        with open(yaml_file, 'r', encoding='utf-8') as f:
-            data = yaml.safe_load(f)
+    def _parse_files(self, paths: List[Path]) -> List[Tuple[Optional[Gene], Optional[str], Optional[str]]]:
+        """
+        Parse YAML files, fanning out over worker processes when configured.
+
+        Returns:
+            One (gene, sha256, error) tuple per path, in input order.
+        """
+        names = [str(path) for path in paths]
+        if self.workers == 1 or len(names) < 2 * self.workers:
+            return _parse_gene_files(names)
+
+        chunk_size = -(-len(names) // (self.workers * 4))
+        chunks = [names[i:i + chunk_size] for i in range(0, len(names), chunk_size)]
+        logger.info("Parsing %d YAML files on %d processes", len(names), self.workers)
+
+        results = []
+        with ProcessPoolExecutor(max_workers=self.workers) as executor:
+            for chunk_results in executor.map(_parse_gene_files, chunks):
+                results.extend(chunk_results)
+        return results
+
+    def _read_snapshot(self) -> Optional[Dict[str, Any]]:
+        """Read the compiled catalog snapshot, or None if missing or stale."""
+        try:
+            with open(self.snapshot_path, 'rb') as f:
+                snapshot = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ImportError, TypeError, ValueError):
+            return None
+
+        if not isinstance(snapshot, dict) or snapshot.get('version') != self.SNAPSHOT_VERSION:
+            return None
+        return snapshot
+
+    def _write_snapshot(self, manifest: Dict[str, Dict[str, Any]], genes: Dict[str, Gene]):
+        """Write the compiled catalog snapshot and its invalidation manifest."""
+        snapshot = {'version': self.SNAPSHOT_VERSION, 'manifest': manifest, 'genes': genes}
+        tmp_path = f"{self.snapshot_path}.tmp"
+        try:
+            with open(tmp_path, 'wb') as f:
+                pickle.dump(snapshot, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, self.snapshot_path)
+        except OSError as e:
+            logger.warning("Could not write catalog snapshot %s: %s", self.snapshot_path, e)
+
+    @staticmethod
+    def _parse_gene_content(content: bytes) -> Optional[Gene]:
+        """Parse the contents of a single gene YAML file."""
+        data = yaml.load(content, Loader=YAML_LOADER)
 
         # Parse variants
         common_variants = []
@@ -233,7 +1869,8 @@ class GeneCatalogLoader:
                 rsid=variant_data['rsid'],
                 chromosome=str(variant_data['chromosome']),
                 position=int(variant_data['position']),
-                description=variant_data['description']
+                description=variant_data['description'],
+                risk_allele=GeneCatalogLoader._parse_risk_allele(variant_data)
             )
             common_variants.append(variant)
 
@@ -243,17 +1880,369 @@ class GeneCatalogLoader:
             full_name=data['full_name'],
             category=data['category'],
             function=data['function'],
-            health_impact=data.get('health_impact', []),
-            common_variants=common_variants,
-            additional_rsids=data.get('additional_rsids', []),
+            health_impact=tuple(data.get('health_impact', ())),
+            common_variants=tuple(common_variants),
+            additional_rsids=tuple(data.get('additional_rsids', ())),
             ancestry_compatibility=data.get('ancestry_compatibility', True),
-            research_sources=data.get('research_sources', []),
+            research_sources=tuple(data.get('research_sources', ())),
             notes=data.get('notes', ''),
             gene_description=data.get('gene_description', '')
         )
 
         return gene
 
+    @staticmethod
+    def _parse_risk_allele(variant_data: Dict[str, Any]) -> Optional[str]:
+        """Read the optional risk_allele (or effect_allele) of a variant."""
+        allele = variant_data.get('risk_allele', variant_data.get('effect_allele'))
+        if allele is None:
+            return None
+        allele = str(allele).upper()
+        if allele not in ALLELE_CODES or allele == '0':
+            raise ValueError(f"Invalid risk allele {allele!r} for {variant_data.get('rsid')}")
+        return allele
+
+    @staticmethod
+    def collect_rsids(genes: List[Gene], merge_table: Optional['RsidMergeTable'] = None) -> Set[str]:
+        """
+        Collect every rsid the matcher will look up for the given genes.
+
+        Args:
+            genes: Loaded genes.
+            merge_table: Optional rsid merge history; the current and
+                retired ids of every rsid are added as well.
+
+        Returns:
+            Set of rsids, suitable as DNAParser target_rsids.
+        """
+        rsids = {variant.rsid for gene in genes for variant in gene.tracked_variants()}
+        if merge_table is not None:
+            rsids = merge_table.expand_rsids(rsids)
+        return rsids
+
+    @staticmethod
+    def build_index(genes: List[Gene]) -> 'CatalogIndex':
+        """Build the inverted rsid index used by VariantMatcher."""
+        return CatalogIndex(genes)
+
+
+class CatalogIndex:
+    """
+    Inverted index from rsid to every (gene, variant) pair that tracks it.
+
+    Covers common variants and additional rsids. rs<digits> ids are keyed by
+    their integer value and kept in sorted order so they can be merge-joined
+    against a GenotypeStore; any other ids are keyed by string. The index
+    holds no sample data and can be reused across samples.
+    """
+
+    def __init__(self, genes: List[Gene]):
+        self.genes = genes
+        self.variants: List[Tuple[Variant, ...]] = [gene.tracked_variants() for gene in genes]
+        self.total_variants = sum(len(variants) for variants in self.variants)
+
+        refs: Dict[int, List[Tuple[int, int]]] = {}
+        other_refs: Dict[str, List[Tuple[int, int]]] = {}
+        for gene_idx, variants in enumerate(self.variants):
+            for variant_idx, variant in enumerate(variants):
+                key = rsid_to_int(variant.rsid)
+                if key is None:
+                    other_refs.setdefault(variant.rsid, []).append((gene_idx, variant_idx))
+                else:
+                    refs.setdefault(key, []).append((gene_idx, variant_idx))
+
+        self.keys: List[int] = sorted(refs)
+        self.refs = refs
+        self.other_refs = other_refs
+
+        # (position, gene_idx, variant_idx) per normalized chromosome, sorted
+        # by position, for variants the catalog gives coordinates for
+        coordinates: Dict[str, List[Tuple[int, int, int]]] = {}
+        for gene_idx, variants in enumerate(self.variants):
+            for variant_idx, variant in enumerate(variants):
+                if variant.chromosome and variant.position > 0:
+                    coordinates.setdefault(normalize_chromosome(variant.chromosome), []).append(
+                        (variant.position, gene_idx, variant_idx)
+                    )
+        self.coordinates = {chromosome: sorted(entries) for chromosome, entries in coordinates.items()}
+        self.risk_codes: List[List[int]] = [
+            [GenotypeInterpreter.risk_allele_code(variant) for variant in variants]
+            for variants in self.variants
+        ]
+
+    def __len__(self) -> int:
+        return len(self.refs) + len(self.other_refs)
+
+
+# ============================================================================
+# Genotype Interpretation
+# ============================================================================
+
+def _build_dosage_table() -> bytes:
+    """Risk allele dosage for every (risk allele code, genotype code) pair."""
+    table = bytearray(16 * 256)
+    for risk_code in range(1, len(ALLELES)):
+        for code in range(256):
+            table[(risk_code << 8) | code] = (code >> 4 == risk_code) + (code & 0x0F == risk_code)
+    return bytes(table)
+
+
+class GenotypeInterpreter:
+    """
+    Interprets many matched genotypes in one pass.
+
+    Inputs are aligned byte strings of packed genotype codes and risk allele
+    codes (0 when the catalog declares none). Zygosity, risk allele dosage
+    and risk flags come out of precomputed lookup tables applied with
+    bytes.translate and map, so no per-variant string work is done.
+    """
+
+    ZYGOSITY_NAMES = ('Homozygous', 'Heterozygous')
+    ZYGOSITY_TABLE = bytes(int(code >> 4 != code & 0x0F) for code in range(256))
+    DOSAGE_TABLE = _build_dosage_table()
+    RISK_FLAG_TABLE = bytes(int(dosage > 0) for dosage in range(256))
+
+    @staticmethod
+    def risk_allele_code(variant: Variant) -> int:
+        """Return the risk allele code declared for a variant, or 0 for none."""
+        allele = variant.risk_allele
+        if allele is None and 'C677T' in variant.variant:
+            # Long-standing default for MTHFR C677T, kept for catalogs without risk_allele
+            allele = 'T'
+        return ALLELE_CODES[allele] if allele else 0
+
+    @classmethod
+    def interpret(cls, genotype_codes: bytes, risk_codes: bytes) -> Tuple[bytes, bytes, bytes]:
+        """
+        Interpret aligned genotype and risk allele codes.
+
+        Returns:
+            Tuple of (zygosity, dosage, risk_flags) byte strings. Zygosity
+            indexes ZYGOSITY_NAMES, dosage is 0, 1 or 2 copies of the risk
+            allele, and risk_flags is 1 where dosage is non-zero.
+        """
+        zygosity = genotype_codes.translate(cls.ZYGOSITY_TABLE)
+        keys = map(operator.or_, map(operator.lshift, risk_codes, repeat(8)), genotype_codes)
+        dosage = bytes(map(cls.DOSAGE_TABLE.__getitem__, keys))
+        risk_flags = dosage.translate(cls.RISK_FLAG_TABLE)
+        return zygosity, dosage, risk_flags
+
+
+# ============================================================================
+# Rsid Merge History
+# ============================================================================
+
+class RsidMergeTable:
+    """
+    Merge history mapping retired rsids to the rsid that replaced them.
+
+    The text source is compiled once into a binary sidecar holding four
+    int64 columns: retired ids in sorted order with their current ids, and
+    the same pairs sorted by current id. The sidecar is memory-mapped and
+    searched with binary search, so every process analyzing samples shares
+    one copy through the page cache instead of building a dict.
+    """
+
+    SUFFIX = '.rsmerge'
+    MAGIC = b'DNARSM01'
+    VERSION = 1
+
+    # dbSNP RsMergeArch column holding the id a retired rsid now resolves to
+    RS_MERGE_ARCH_CURRENT = 6
+
+    def __init__(
+        self,
+        old_ids: Sequence[int],
+        current_ids: Sequence[int],
+        by_current: Sequence[int],
+        by_current_old: Sequence[int],
+        path: Optional[str] = None
+    ):
+        self.old_ids = old_ids
+        self.current_ids = current_ids
+        self.by_current = by_current
+        self.by_current_old = by_current_old
+        self.path = path
+
+    def __len__(self) -> int:
+        return len(self.old_ids)
+
+    def current(self, key: int) -> int:
+        """Return the current id for an rsid integer, or the id itself if it was never merged."""
+        old_ids = self.old_ids
+        idx = bisect_left(old_ids, key)
+        if idx < len(old_ids) and old_ids[idx] == key:
+            return self.current_ids[idx]
+        return key
+
+    def retired(self, key: int) -> Sequence[int]:
+        """Return the retired ids that were merged into a current id."""
+        start = bisect_left(self.by_current, key)
+        end = bisect_right(self.by_current, key, start)
+        return self.by_current_old[start:end]
+
+    def aliases(self, key: int) -> List[int]:
+        """
+        Return every other id a variant may be reported under.
+
+        The current id comes first, followed by the ids retired into it.
+        """
+        current = self.current(key)
+        aliases = [current] if current != key else []
+        aliases.extend(old for old in self.retired(current) if old != key)
+        return aliases
+
+    def expand_rsids(self, rsids: Set[str]) -> Set[str]:
+        """Return rsids together with all of their aliases, e.g. for DNAParser target_rsids."""
+        expanded = set(rsids)
+        for rsid in rsids:
+            key = rsid_to_int(rsid)
+            if key is not None:
+                expanded.update(f"rs{alias}" for alias in self.aliases(key))
+        return expanded
+
+    @classmethod
+    def load(cls, source_path: str) -> 'RsidMergeTable':
+        """
+        Open the compiled table for a merge history file.
+
+        source_path may be a compiled table itself, or a text source (plain,
+        gzip or zip) that is compiled to a sidecar next to it on first use
+        and recompiled whenever the source changes.
+        """
+        if cls._read_header(source_path) is not None:
+            return cls.open(source_path)
+
+        table_path = source_path + cls.SUFFIX
+        stat = os.stat(source_path)
+        try:
+            header = cls._read_header(table_path)
+        except (OSError, ValueError, struct.error):
+            header = None
+
+        if (
+            header is not None
+            and header.get('version') == cls.VERSION
+            and header.get('byteorder') == sys.byteorder
+            and header.get('source_size') == stat.st_size
+            and header.get('source_mtime_ns') == stat.st_mtime_ns
+        ):
+            return cls.open(table_path)
+
+        logger.info("Compiling rsid merge history: %s", source_path)
+        mapping = cls.read_source(source_path)
+        cls.write(table_path, mapping, {'source_size': stat.st_size, 'source_mtime_ns': stat.st_mtime_ns})
+        return cls.open(table_path)
+
+    @classmethod
+    def read_source(cls, path: str) -> Dict[int, int]:
+        """
+        Read a merge history text file into a retired id -> current id map.
+
+        Accepts dbSNP RsMergeArch dumps (tab-separated, rsCurrent in the
+        seventh column) and plain two-column 'old new' files, with or
+        without the 'rs' prefix. Lines that do not hold two rsids, such as
+        headers, are skipped. Chains (a -> b, b -> c) resolve to the last id.
+        """
+        mapping: Dict[int, int] = {}
+        skipped = 0
+        with open_raw_data(path) as (stream, _):
+            for line in stream:
+                line = line.strip()
+                if not line or line.startswith(b'#'):
+                    continue
+                fields = line.split(b'\t') if b'\t' in line else line.split()
+                column = cls.RS_MERGE_ARCH_CURRENT if len(fields) > cls.RS_MERGE_ARCH_CURRENT else 1
+                try:
+                    old = int(fields[0].strip().removeprefix(b'rs'))
+                    current = int(fields[column].strip().removeprefix(b'rs'))
+                except (IndexError, ValueError):
+                    skipped += 1
+                    continue
+                if old != current:
+                    mapping[old] = current
+
+        if skipped:
+            logger.warning("Skipped %d lines without two rsids in %s", skipped, path)
+
+        resolved = {}
+        for old, current in mapping.items():
+            seen = {old}
+            while current in mapping and current not in seen:
+                seen.add(current)
+                current = mapping[current]
+            resolved[old] = current
+        return resolved
+
+    # Binary layout: magic, uint32 header length, JSON header, then the
+    # old_ids, current_ids, by_current and by_current_old int64 columns,
+    # each starting on an 8-byte boundary.
+
+    @classmethod
+    def write(cls, path: str, mapping: Dict[int, int], header: Dict[str, Any]):
+        """Write a compiled table for a retired id -> current id map."""
+        old_ids = sorted(mapping)
+        current_ids = [mapping[old] for old in old_ids]
+        by_current = sorted(zip(current_ids, old_ids))
+
+        header = dict(header, version=cls.VERSION, rows=len(old_ids), byteorder=sys.byteorder)
+        header_bytes = json.dumps(header).encode('utf-8')
+        tmp_path = f"{path}.tmp"
+
+        with open(tmp_path, 'wb') as f:
+            f.write(cls.MAGIC)
+            f.write(struct.pack('<I', len(header_bytes)))
+            f.write(header_bytes)
+            for column in (
+                old_ids,
+                current_ids,
+                [current for current, _ in by_current],
+                [old for _, old in by_current]
+            ):
+                f.write(b'\0' * (-f.tell() % 8))
+                f.write(array('q', column).tobytes())
+
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def _read_header(cls, path: str) -> Optional[Dict[str, Any]]:
+        """Return the JSON header of a compiled table, or None if it is not one."""
+        with open(path, 'rb') as f:
+            if f.read(len(cls.MAGIC)) != cls.MAGIC:
+                return None
+            (header_len,) = struct.unpack('<I', f.read(4))
+            return json.loads(f.read(header_len).decode('utf-8'))
+
+    @classmethod
+    def open(cls, path: str) -> 'RsidMergeTable':
+        """Memory-map a compiled table. Columns are zero-copy views of the map."""
+        with open(path, 'rb') as f:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        view = memoryview(buffer)
+        offset = len(cls.MAGIC)
+        (header_len,) = struct.unpack_from('<I', buffer, offset)
+        offset += 4
+        header = json.loads(bytes(view[offset:offset + header_len]).decode('utf-8'))
+        offset += header_len
+        if header.get('byteorder') != sys.byteorder:
+            raise ValueError(f"Rsid merge table was compiled on a different byte order: {path}")
+
+        rows = header['rows']
+        columns = []
+        for _ in range(4):
+            offset += -offset % 8
+            if offset + rows * 8 > len(buffer):
+                raise ValueError(f"Truncated rsid merge table: {path}")
+            columns.append(view[offset:offset + rows * 8].cast('q'))
+            offset += rows * 8
+
+        table = cls(*columns, path=path)
+        table.header = header
+        table._buffer = buffer
+        logger.info("Opened rsid merge history with %d merged rsids: %s", rows, path)
+        return table
+
 
 # ============================================================================
 # Variant Matcher
@@ -262,8 +2251,51 @@ class GeneCatalogLoader:
 class VariantMatcher:
     """Matches DNA genotypes against gene variants."""
 
-    def __init__(self, genotypes: Dict[str, Genotype]):
+    # Positional fallback modes: one binary search per unmatched variant, or
+    # one merge-join sweep per chromosome over all unmatched variants
+    POSITION_LOOKUP = 'lookup'
+    POSITION_MERGE = 'merge'
+    POSITION_MODES = (POSITION_LOOKUP, POSITION_MERGE)
+
+    def __init__(
+        self,
+        genotypes: Mapping[str, Genotype],
+        index: Optional[CatalogIndex] = None,
+        position_match: Optional[str] = None,
+        merge_table: Optional[RsidMergeTable] = None,
+        database: Optional['ResultDatabase'] = None,
+        sample: str = ''
+    ):
+        """
+        Args:
+            genotypes: Sample genotypes keyed by rsid.
+            index: Prebuilt catalog index; reuse one across samples to avoid
+                rebuilding it for every match() call.
+            position_match: Optional fallback ('lookup' or 'merge') that
+                resolves catalog variants whose rsid is not in the sample
+                by chromosome and position instead, e.g. after an rsid
+                merge. Catalog coordinates must use the sample's genome
+                build. Only applies when genotypes is a GenotypeStore, which
+                must not come from a targeted parse.
+            merge_table: Optional rsid merge history. Catalog rsids that
+                are not in the sample are retried under their current and
+                retired ids before any positional fallback.
+            database: Optional results database that receives the calls
+                of every match() under `sample`.
+            sample: DNA file path the calls are stored for.
+        """
+        if position_match is not None and position_match not in self.POSITION_MODES:
+            raise ValueError(f"Unknown position match mode: {position_match!r}")
+        if position_match is not None and getattr(genotypes, 'targeted', False):
+            # A targeted parse keeps only catalog rsids, which are exactly
+            # the rows the positional fallback cannot find
+            raise ValueError("position_match needs a full parse; use DNAParser(position_index=True)")
         self.genotypes = genotypes
+        self.index = index
+        self.position_match = position_match
+        self.merge_table = merge_table
+        self.database = database
+        self.sample = sample
 
     def match(self, genes: List[Gene]) -> MatchResults:
         """
@@ -275,33 +2307,115 @@ class VariantMatcher:
         Returns:
             MatchResults object with matched variants.
         """
+        logger.info("Matching variants...")
+
+        index = self.index
+        if index is None or index.genes is not genes:
+            index = CatalogIndex(genes)
+
         results = MatchResults()
+        self.results_from_hits(index, self.find_hits(index, results), results)
 
-        print("Matching variants...")
+        logger.info("Matched %d of %d variants", results.total_variants_found, results.total_variants_checked)
+        if results.variants_found_by_merged_rsid:
+            logger.info("Resolved %d variants through the rsid merge history", results.variants_found_by_merged_rsid)
+        if results.variants_found_by_position:
+            logger.info("Resolved %d variants by chromosome and position", results.variants_found_by_position)
+        logger.info("Coverage: %.1f%%", results.coverage_percentage)
 
-        for gene in genes:
-            gene_has_match = False
+        if self.database is not None:
+            self.database.write_sample(self.sample, results)
+        return results
+
+    def find_hits(self, index: CatalogIndex, results: Optional[MatchResults] = None) -> List[Tuple[int, int, int]]:
+        """
+        Look up every catalog variant in the sample.
+
+        Args:
+            index: Catalog index to match.
+            results: Optional MatchResults that receives the counts of
+                variants resolved by the merge history and by position.
+
+        Returns:
+            One (gene_idx, variant_idx, packed genotype code) tuple per
+            variant found, with indexes into the catalog index.
+        """
+        # One pass over the distinct catalog rsids; shared rsids are looked up once
+        hits: List[Tuple[int, int, int]] = []
+        for refs, code in self._lookup(index):
+            for gene_idx, variant_idx in refs:
+                hits.append((gene_idx, variant_idx, code))
+
+        matched = {(gene_idx, variant_idx) for gene_idx, variant_idx, _ in hits}
+        merged_hits: List[Tuple[int, int, int]] = []
+        position_hits: List[Tuple[int, int, int]] = []
+
+        if self.merge_table is not None:
+            for refs, code in self._lookup_merged(index, matched):
+                for gene_idx, variant_idx in refs:
+                    merged_hits.append((gene_idx, variant_idx, code))
+                    matched.add((gene_idx, variant_idx))
+            hits.extend(merged_hits)
+
+        if self.position_match is not None and isinstance(self.genotypes, GenotypeStore):
+            position_hits = list(self._lookup_positions(index, matched))
+            hits.extend(position_hits)
+
+        if results is not None:
+            results.variants_found_by_merged_rsid = len(merged_hits)
+            results.variants_found_by_position = len(position_hits)
+        return hits
+
+    @staticmethod
+    def results_from_hits(
+        index: CatalogIndex,
+        hits: List[Tuple[int, int, int]],
+        results: Optional[MatchResults] = None
+    ) -> MatchResults:
+        """
+        Interpret (gene_idx, variant_idx, packed genotype code) hits into MatchResults.
 
-            for variant in gene.common_variants:
-                results.total_variants_checked += 1
+        Hits may come from find_hits() or from a cache of an earlier match;
+        either way the outcome only depends on the catalog and the codes.
+        """
+        if results is None:
+            results = MatchResults()
+        genes = index.genes
+
+        # Report order follows catalog order, as if genes were scanned in turn
+        hits = sorted(hits, key=lambda hit: (hit[0], hit[1]))
+        found_per_gene = Counter(gene_idx for gene_idx, _, _ in hits)
+
+        # Interpret every hit in one batched pass
+        zygosity, dosage, risk_flags = GenotypeInterpreter.interpret(
+            bytes(code for _, _, code in hits),
+            bytes(index.risk_codes[gene_idx][variant_idx] for gene_idx, variant_idx, _ in hits)
+        )
 
-                # Check if rsid exists in DNA data
-                if variant.rsid in self.genotypes:
-                    genotype_obj = self.genotypes[variant.rsid]
-                    matched_variant = self._create_matched_variant(
-                        gene, variant, genotype_obj
-                    )
-                    results.matched_variants.append(matched_variant)
-                    results.total_variants_found += 1
-                    results.genes_with_matches.add(gene.symbol)
-                    gene_has_match = True
-                elif not gene.ancestry_compatibility:
-                    # Variant not tested by Ancestry
-                    results.genes_without_matches.add(gene.symbol)
-
-            if not gene_has_match and gene.ancestry_compatibility:
+        for pos, (gene_idx, variant_idx, code) in enumerate(hits):
+            gene = genes[gene_idx]
+            results.matched_variants.append(MatchedVariant(
+                index=index,
+                gene_idx=gene_idx,
+                variant_idx=variant_idx,
+                genotype=genotype_from_code(code),
+                genotype_type=GenotypeInterpreter.ZYGOSITY_NAMES[zygosity[pos]],
+                is_risk_allele=bool(risk_flags[pos]),
+                risk_allele_dosage=dosage[pos]
+            ))
+            results.genes_with_matches.add(gene.symbol)
+
+        for gene_idx, gene in enumerate(genes):
+            found = found_per_gene[gene_idx]
+            if found == 0 and gene.ancestry_compatibility:
                 # Gene has no matches but is compatible
                 results.genes_without_matches.add(gene.symbol)
+            elif found < len(index.variants[gene_idx]) and not gene.ancestry_compatibility:
+                # Variant not tested by Ancestry
+                results.genes_without_matches.add(gene.symbol)
+
+        results.total_variants_checked = index.total_variants
+        results.total_variants_found = len(hits)
 
         # Calculate coverage
         if results.total_variants_checked > 0:
@@ -309,58 +2423,97 @@ class VariantMatcher:
                 results.total_variants_found / results.total_variants_checked
             ) * 100
 
-        print(f"Matched {results.total_variants_found} of {results.total_variants_checked} variants")
-        print(f"Coverage: {results.coverage_percentage:.1f}%")
-
         return results
 
-    def _create_matched_variant(
+    def _lookup(self, index: CatalogIndex) -> Iterator[Tuple[List[Tuple[int, int]], int]]:
+        """Yield (index refs, packed genotype code) for every catalog rsid in the sample."""
+        genotypes = self.genotypes
+
+        if isinstance(genotypes, GenotypeStore):
+            # Sorted merge-join of catalog keys against the store's sorted ids,
+            # using binary search to skip ahead between keys
+            ids = genotypes.ids
+            codes = genotypes.allele_codes
+            n_rows = len(ids)
+            row = 0
+            for key in index.keys:
+                row = bisect_left(ids, key, row)
+                if row == n_rows:
+                    break
+                if ids[row] == key:
+                    yield index.refs[key], codes[row]
+            for rsid, refs in index.other_refs.items():
+                row = genotypes.row(rsid)
+                if row >= 0:
+                    yield refs, codes[row]
+            return
+
+        for key in index.keys:
+            genotype_obj = genotypes.get(f"rs{key}")
+            if genotype_obj is not None:
+                yield index.refs[key], self._genotype_code(genotype_obj)
+        for rsid, refs in index.other_refs.items():
+            genotype_obj = genotypes.get(rsid)
+            if genotype_obj is not None:
+                yield refs, self._genotype_code(genotype_obj)
+
+    def _lookup_merged(
         self,
-        gene: Gene,
-        variant: Variant,
-        genotype_obj: Genotype
-    ) -> MatchedVariant:
-        """Create a MatchedVariant object."""
-        genotype = genotype_obj.genotype
-        genotype_type, interpretation, is_risk = self._interpret_genotype(
-            variant, genotype
-        )
-
-        return MatchedVariant(
-            gene=gene,
-            variant=variant,
-            genotype=genotype,
-            genotype_type=genotype_type,
-            interpretation=interpretation,
-            is_risk_allele=is_risk
-        )
-
-    def _interpret_genotype(
+        index: CatalogIndex,
+        matched: Set[Tuple[int, int]]
+    ) -> Iterator[Tuple[List[Tuple[int, int]], int]]:
+        """Yield (index refs, packed genotype code) for unmatched catalog rsids found under an alias."""
+        genotypes = self.genotypes
+        table = self.merge_table
+
+        for key in index.keys:
+            refs = index.refs[key]
+            if refs[0] in matched:
+                continue
+            for alias in table.aliases(key):
+                if isinstance(genotypes, GenotypeStore):
+                    row = bisect_left(genotypes.ids, alias)
+                    if row < len(genotypes.ids) and genotypes.ids[row] == alias:
+                        yield refs, genotypes.allele_codes[row]
+                        break
+                else:
+                    genotype_obj = genotypes.get(f"rs{alias}")
+                    if genotype_obj is not None:
+                        yield refs, self._genotype_code(genotype_obj)
+                        break
+
+    def _lookup_positions(
         self,
-        variant: Variant,
-        genotype: str
-    ) -> tuple[str, str, bool]:
-        """
-        Interpret genotype based on variant description.
+        index: CatalogIndex,
+        matched: Set[Tuple[int, int]]
+    ) -> Iterator[Tuple[int, int, int]]:
+        """Yield (gene_idx, variant_idx, packed genotype code) for unmatched variants found by coordinate."""
+        store = self.genotypes
+        position_index = store.position_index()
+        codes = store.allele_codes
+
+        for chromosome, entries in index.coordinates.items():
+            pending = [entry for entry in entries if (entry[1], entry[2]) not in matched]
+            if not pending:
+                continue
 
-        Returns:
-            Tuple of (genotype_type, interpretation, is_risk_allele)
-        """
-        # Simple interpretation based on homozygous/heterozygous
-        if genotype[0] == genotype[1]:
-            genotype_type = "Homozygous"
-            interpretation = f"Both alleles are {genotype[0]}. {variant.description}"
-        else:
-            genotype_type = "Heterozygous"
-            interpretation = f"One {genotype[0]} and one {genotype[1]} allele. {variant.description}"
+            if self.position_match == self.POSITION_MERGE:
+                found = position_index.join(chromosome, [position for position, _, _ in pending])
+            else:
+                found = []
+                for pos, (position, _, _) in enumerate(pending):
+                    row = position_index.lookup(chromosome, position)
+                    if row >= 0:
+                        found.append((pos, row))
 
-        # Determine if risk allele (simplified logic)
-        # This is a placeholder - real implementation would need more sophisticated logic
-        is_risk = False
-        if 'T' in genotype and 'C677T' in variant.variant:
-            is_risk = True
+            for pos, row in found:
+                _, gene_idx, variant_idx = pending[pos]
+                yield gene_idx, variant_idx, codes[row]
 
-        return genotype_type, interpretation, is_risk
+    @staticmethod
+    def _genotype_code(genotype_obj: Genotype) -> int:
+        """Pack a Genotype's alleles into a genotype code."""
+        return (ALLELE_CODES[genotype_obj.allele1.upper()] << 4) | ALLELE_CODES[genotype_obj.allele2.upper()]
 
 
 # ============================================================================
@@ -383,6 +2536,13 @@ class ReportGenerator:
         'additional-important-genes'
     ]
 
+    WRITE_BUFFER_SIZE = 1 << 16
+
+    # Optional HTML comment in front of every section, so a later run can
+    # replace single sections of an existing report
+    SECTION_MARKER = '<!-- report-section: {} -->\n'
+    SECTION_PATTERN = re.compile(r'(?:^|\n\n)<!-- report-section: (\S+) -->\n')
+
     CATEGORY_NAMES = {
         'top-priority-genes': 'Top Priority Genes',
         'high-impact-health-genes': 'High-Impact Health Genes',
@@ -396,36 +2556,73 @@ class ReportGenerator:
         'additional-important-genes': 'Additional Important Genes'
     }
 
-    def __init__(self, genes: List[Gene], match_results: MatchResults, dna_file_path: str):
+    def __init__(
+        self,
+        genes: List[Gene],
+        match_results: MatchResults,
+        dna_file_path: str,
+        section_markers: bool = False,
+        fragments: Optional[Dict[str, str]] = None
+    ):
+        """
+        Args:
+            genes: Gene catalog the matches were made against.
+            match_results: Output of VariantMatcher.match().
+            dna_file_path: Source file named in the report.
+            section_markers: Put a SECTION_MARKER comment in front of each
+                section. Sections listed in `reused_sections` are then
+                copied verbatim instead of rendered.
+            fragments: Cache of the report text that depends only on the
+                catalog. Pass the same dict to every report rendered from
+                the same genes to render that text once.
+        """
         self.genes = genes
         self.match_results = match_results
         self.dna_file_path = dna_file_path
+        self.section_markers = section_markers
+        self.fragments = fragments
+        self.reused_sections: Dict[str, str] = {}
+        self.grouping = self._group()
         self.category_stats = self._calculate_category_stats()
 
+    def _group(self) -> ReportGrouping:
+        """Group genes and matches by category in a single pass over each."""
+        grouping = ReportGrouping()
+
+        for gene in self.genes:
+            grouping.genes_by_category.setdefault(gene.category, []).append(gene)
+            grouping.variants_checked_by_category[gene.category] = (
+                grouping.variants_checked_by_category.get(gene.category, 0)
+                + len(gene.tracked_variants())
+            )
+            if not gene.ancestry_compatibility:
+                grouping.genes_needing_testing.append(gene)
+
+        for mv in self.match_results.matched_variants:
+            by_gene = grouping.matches_by_category.setdefault(mv.gene.category, {})
+            by_gene.setdefault(mv.gene.symbol, []).append(mv)
+            if mv.is_risk_allele:
+                grouping.risk_variants.append(mv)
+
+        return grouping
+
     def _calculate_category_stats(self) -> Dict[str, CategoryStats]:
         """Calculate statistics for each category."""
         stats = {}
-
-        # Group genes by category
-        genes_by_category: Dict[str, List[Gene]] = {}
-        for gene in self.genes:
-            if gene.category not in genes_by_category:
-                genes_by_category[gene.category] = []
-            genes_by_category[gene.category].append(gene)
+        grouping = self.grouping
 
         # Calculate stats for each category
-        for category, category_genes in genes_by_category.items():
-            category_variants = self.match_results.matched_variants
-            category_matches = [mv for mv in category_variants if mv.gene.category == category]
+        for category, category_genes in grouping.genes_by_category.items():
+            matches_by_gene = grouping.matches_by_category.get(category, {})
 
-            total_variants_checked = sum(len(g.common_variants) for g in category_genes)
-            total_variants_found = len(category_matches)
+            total_variants_checked = grouping.variants_checked_by_category[category]
+            total_variants_found = sum(len(matches) for matches in matches_by_gene.values())
 
             coverage = 0.0
             if total_variants_checked > 0:
                 coverage = (total_variants_found / total_variants_checked) * 100
 
-            genes_with_matches = len({mv.gene.symbol for mv in category_matches})
+            genes_with_matches = len(matches_by_gene)
             genes_without_matches = len(category_genes) - genes_with_matches
 
             stats[category] = CategoryStats(
@@ -440,57 +2637,124 @@ class ReportGenerator:
 
         return stats
 
-    def generate(self, output_path: str = 'SUMMARY-FROM-RAW-DNA.md'):
-        """Generate the complete DNA analysis report."""
-        print(f"Generating report: {output_path}")
-
-        report_parts = []
+    def generate(self, output_path: Union[str, TextIO] = 'SUMMARY-FROM-RAW-DNA.md'):
+        """
+        Generate the complete DNA analysis report.
 
+        Args:
+            output_path: File path to write, or any text sink with a write()
+                method. Sections are streamed to it as they are produced.
+        """
+        if not isinstance(output_path, str):
+            self.write_to(output_path)
+            return
+
+        logger.info("Generating report: %s", output_path)
+
+        with open(output_path, 'w', encoding='utf-8', buffering=self.WRITE_BUFFER_SIZE) as f:
+            self.write_to(f)
+
+        logger.info("Report generated successfully: %s", output_path)
+
+    def write_to(self, sink: TextIO):
+        """Stream the report into a text sink chunk by chunk."""
+        write = sink.write
+        for chunk in self.iter_chunks():
+            write(chunk)
+
+    def iter_chunks(self) -> Iterator[str]:
+        """Yield the report as a sequence of text chunks."""
+        for idx, (section_id, section) in enumerate(self._sections()):
+            if idx:
+                yield '\n\n'
+            if self.section_markers:
+                yield self.SECTION_MARKER.format(section_id)
+                if section_id in self.reused_sections:
+                    yield self.reused_sections[section_id]
+                    continue
+            yield from section()
+
+    def _sections(self) -> Iterator[Tuple[str, Callable[[], Iterator[str]]]]:
+        """Yield (section id, section generator) pairs in report order."""
         # Header
-        report_parts.append(self._generate_header())
+        yield 'header', self._generate_header
 
         # Table of Contents
-        report_parts.append(self._generate_table_of_contents())
+        yield 'table-of-contents', self._generate_table_of_contents
 
         # Overall Statistics
-        report_parts.append(self._generate_overall_statistics())
+        yield 'overall-statistics', self._generate_overall_statistics
 
         # Methodology
-        report_parts.append(self._generate_methodology())
+        yield 'methodology', self._generate_methodology
 
         # Category Sections
         for category in self.CATEGORY_ORDER:
             if category in self.category_stats:
-                report_parts.append(self._generate_category_section(category))
+                yield self.category_section_id(category), (
+                    lambda category=category: self._generate_category_section(category)
+                )
 
         # Summary & Recommendations
-        report_parts.append(self._generate_summary_and_recommendations())
+        yield 'summary', self._generate_summary_and_recommendations
 
         # Disclaimer
-        report_parts.append(self._generate_disclaimer())
+        yield 'disclaimer', self._generate_disclaimer
+
+    def _fragment(self, key: str, render: Callable[[], Iterator[str]]) -> Iterator[str]:
+        """Yield catalog-only text, from the fragment cache when it has it."""
+        if self.fragments is None:
+            yield from render()
+            return
+        text = self.fragments.get(key)
+        if text is None:
+            text = self.fragments[key] = ''.join(render())
+        yield text
+
+    @staticmethod
+    def category_section_id(category: str) -> str:
+        """Return the section id of a category section."""
+        return f"category:{category}"
+
+    @classmethod
+    def read_sections(cls, path: str) -> Optional[Dict[str, str]]:
+        """
+        Split a report written with section markers into its sections.
 
-        # Write to file
-        report_content = '\n\n'.join(report_parts)
-        with open(output_path, 'w', encoding='utf-8') as f:
-            f.write(report_content)
+        Returns:
+            Section text keyed by section id, or None if the file is missing
+            or has no markers.
+        """
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                text = f.read()
+        except OSError:
+            return None
 
-        print(f"Report generated successfully: {output_path}")
+        parts = cls.SECTION_PATTERN.split(text)
+        if len(parts) < 3 or parts[0]:
+            return None
+        return dict(zip(parts[1::2], parts[2::2]))
 
-    def _generate_header(self) -> str:
+    def _generate_header(self) -> Iterator[str]:
         """Generate report header."""
         timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S UTC')
         total_genes = len(self.genes)
 
-        return f"""# DNA Analysis Report from Ancestry.com Raw Data
+        yield f"""# DNA Analysis Report from Ancestry.com Raw Data
 
 **Generated:** {timestamp}
 **Source:** {self.dna_file_path}
 **Genes Analyzed:** {total_genes}
 """
 
-    def _generate_table_of_contents(self) -> str:
+    def _generate_table_of_contents(self) -> Iterator[str]:
         """Generate table of contents."""
-        return """## Table of Contents
+        yield from self._fragment('table-of-contents', self._render_table_of_contents)
+
+    def _render_table_of_contents(self) -> Iterator[str]:
+        """Render the table of contents, which is the same for every report."""
+        yield """## Table of Contents
 
 1. [Overall Statistics](#overall-statistics)
 2. [Methodology](#methodology)
@@ -508,7 +2772,7 @@ class ReportGenerator:
 14. [Disclaimer](#disclaimer)
 """
 
-    def _generate_overall_statistics(self) -> str:
+    def _generate_overall_statistics(self) -> Iterator[str]:
         """Generate overall statistics section."""
         total_variants = sum(cs.total_variants_checked for cs in self.category_stats.values())
         total_found = sum(cs.total_variants_found for cs in self.category_stats.values())
@@ -516,19 +2780,20 @@ class ReportGenerator:
         if total_variants > 0:
             overall_coverage = (total_found / total_variants) * 100
 
-        stats_table = "| Category | Genes | Variants Checked | Variants Found | Coverage |\n"
-        stats_table += "|----------|--------|------------------|----------------|----------|\n"
+        yield """## Overall Statistics
+
+### Analysis Coverage
+
+"""
+        yield "| Category | Genes | Variants Checked | Variants Found | Coverage |\n"
+        yield "|----------|--------|------------------|----------------|----------|\n"
 
         for category in self.CATEGORY_ORDER:
             if category in self.category_stats:
                 cs = self.category_stats[category]
-                stats_table += f"| {cs.category_name} | {cs.total_genes} | {cs.total_variants_checked} | {cs.total_variants_found} | {cs.coverage_percentage:.1f}% |\n"
-
-        return f"""## Overall Statistics
+                yield f"| {cs.category_name} | {cs.total_genes} | {cs.total_variants_checked} | {cs.total_variants_found} | {cs.coverage_percentage:.1f}% |\n"
 
-### Analysis Coverage
-
-{stats_table}
+        yield f"""
 
 ### Summary
 
@@ -538,9 +2803,9 @@ class ReportGenerator:
 - **Overall Coverage:** {overall_coverage:.1f}%
 """
 
-    def _generate_methodology(self) -> str:
+    def _generate_methodology(self) -> Iterator[str]:
         """Generate methodology section."""
-        return """## Methodology
+        yield """## Methodology
 
 This report was generated by:
 
@@ -572,35 +2837,22 @@ This report was generated by:
 - Each variant interpretation includes information from the gene catalog
 """.format(dna_file_path=self.dna_file_path, len_genes=len(self.genes), len_categories=len(self.category_stats))
 
-    def _generate_category_section(self, category: str) -> str:
+    def _generate_category_section(self, category: str) -> Iterator[str]:
         """Generate section for a specific category."""
         category_name = self.CATEGORY_NAMES.get(category, category)
         stats = self.category_stats[category]
 
         # Get genes for this category
-        category_genes = [g for g in self.genes if g.category == category]
-        
-        # Debug: Print category info
-        print(f"DEBUG: Category: {category}, Type: {type(category)}")
-        print(f"DEBUG: Category genes count: {len(category_genes)}")
-        if category_genes:
-            print(f"DEBUG: First gene type: {type(category_genes[0])}")
-            print(f"DEBUG: First gene: {category_genes[0]}")
-
-        # Get matched variants for this category
-        category_matches = [mv for mv in self.match_results.matched_variants if mv.gene.category == category]
-
-        # Group matches by gene symbol
-        matches_by_gene: Dict[str, List[MatchedVariant]] = {}
-        for mv in category_matches:
-            if mv.gene.symbol not in matches_by_gene:
-                matches_by_gene[mv.gene.symbol] = []
-            matches_by_gene[mv.gene.symbol].append(mv)
-
-        section = f"## {category_name}\n\n"
+        category_genes = self.grouping.genes_by_category.get(category, [])
+        logger.debug("Rendering category %s with %d genes", category, len(category_genes))
+
+        # Matched variants for this category, grouped by gene symbol
+        matches_by_gene = self.grouping.matches_by_category.get(category, {})
+
+        yield f"## {category_name}\n\n"
 
         # Category Overview
-        section += f"""### Genetic Classification
+        yield f"""### Genetic Classification
 
 This category contains {stats.total_genes} genes related to {category_name.lower()}. These genes play important roles in various biological processes and have been identified through research as having significant health implications.
 
@@ -614,68 +2866,74 @@ This category contains {stats.total_genes} genes related to {category_name.lower
 """
 
         # List all genes
-        section += "#### Gene Information\n\n"
-        for idx, gene_info in enumerate(category_genes):
-            print(f"DEBUG: Iterating gene {idx}, type: {type(gene_info)}, value: {gene_info}")
-            section += f"**{gene_info.symbol.upper()}** - {gene_info.full_name}\n"
-            section += f"- **Function:** {gene_info.function}\n"
-            section += f"- **Health Impacts:** {', '.join(gene_info.health_impact)}\n"
-            section += f"- **Variants Tracked:** {len(gene_info.common_variants)} common variants\n"
-            if not gene_info.ancestry_compatibility:
-                section += f"- **Note:** Some variants may not be tested by Ancestry.com\n"
-            section += "\n"
+        yield from self._fragment(
+            f"gene-information:{category}",
+            lambda: self._render_gene_information(category_genes)
+        )
 
         # DNA Analysis Results
-        section += "### DNA Analysis Results\n\n"
+        yield "### DNA Analysis Results\n\n"
 
         if matches_by_gene:
             for gene_symbol, matches in matches_by_gene.items():
                 gene = matches[0].gene  # Get gene from first match
-                section += f"#### {gene.symbol.upper()} - {gene.full_name}\n\n"
-                section += f"**Function:** {gene.function}\n\n"
-                section += f"**Health Impacts:**\n"
+                yield f"#### {gene.symbol.upper()} - {gene.full_name}\n\n"
+                yield f"**Function:** {gene.function}\n\n"
+                yield f"**Health Impacts:**\n"
                 for impact in gene.health_impact:
-                    section += f"- {impact}\n"
-                section += "\n"
+                    yield f"- {impact}\n"
+                yield "\n"
 
-                section += "**Variants Found:**\n\n"
-                section += "| Variant | rsid | Genotype | Type | Interpretation |\n"
-                section += "|----------|------|----------|------|----------------|\n"
+                yield "**Variants Found:**\n\n"
+                yield "| Variant | rsid | Genotype | Type | Interpretation |\n"
+                yield "|----------|------|----------|------|----------------|\n"
 
                 for mv in matches:
-                    section += f"| {mv.variant.variant} | {mv.variant.rsid} | {mv.genotype} | {mv.genotype_type} | {mv.interpretation[:100]}... |\n"
+                    yield f"| {mv.variant.variant} | {mv.variant.rsid} | {mv.genotype} | {mv.genotype_type} | {mv.interpretation[:100]}... |\n"
 
-                section += "\n"
+                yield "\n"
         else:
-            section += "**No variants found in DNA data for this category.**\n\n"
+            yield "**No variants found in DNA data for this category.**\n\n"
 
         # Category Summary
-        section += "### Category Summary\n\n"
-        section += f"**Key Findings:**\n"
-        section += f"- {stats.genes_with_matches} of {stats.total_genes} genes have matching variants in your DNA data\n"
-        section += f"- {stats.total_variants_found} variants were found out of {stats.total_variants_checked} checked\n"
-        section += f"- Coverage: {stats.coverage_percentage:.1f}%\n\n"
+        yield "### Category Summary\n\n"
+        yield f"**Key Findings:**\n"
+        yield f"- {stats.genes_with_matches} of {stats.total_genes} genes have matching variants in your DNA data\n"
+        yield f"- {stats.total_variants_found} variants were found out of {stats.total_variants_checked} checked\n"
+        yield f"- Coverage: {stats.coverage_percentage:.1f}%\n\n"
 
         if stats.genes_without_matches > 0:
-            section += f"**Note:** {stats.genes_without_matches} genes in this category have no matching variants. This could mean:\n"
-            section += "- The variants are not tested by Ancestry.com\n"
-            section += "- You have the normal (non-risk) alleles\n"
-            section += "- The variants are not present in your DNA\n\n"
-
-        return section
+            yield f"**Note:** {stats.genes_without_matches} genes in this category have no matching variants. This could mean:\n"
+            yield "- The variants are not tested by Ancestry.com\n"
+            yield "- You have the normal (non-risk) alleles\n"
+            yield "- The variants are not present in your DNA\n\n"
+
+    def _render_gene_information(self, category_genes: List[Gene]) -> Iterator[str]:
+        """Render the gene list of a category, which depends only on the catalog."""
+        yield "#### Gene Information\n\n"
+        for gene_info in category_genes:
+            additional = len(gene_info.tracked_variants()) - len(gene_info.common_variants)
+            yield (
+                f"**{gene_info.symbol.upper()}** - {gene_info.full_name}\n"
+                f"- **Function:** {gene_info.function}\n"
+                f"- **Health Impacts:** {', '.join(gene_info.health_impact)}\n"
+                f"- **Variants Tracked:** {len(gene_info.common_variants)} common variants"
+                + (f", {additional} additional rsids\n" if additional else "\n")
+            )
+            if not gene_info.ancestry_compatibility:
+                yield f"- **Note:** Some variants may not be tested by Ancestry.com\n"
+            yield "\n"
 
-    def _generate_summary_and_recommendations(self) -> str:
+    def _generate_summary_and_recommendations(self) -> Iterator[str]:
         """Generate summary and recommendations section."""
         total_variants = sum(cs.total_variants_checked for cs in self.category_stats.values())
         total_found = sum(cs.total_variants_found for cs in self.category_stats.values())
 
-        # Count risk alleles
-        risk_variants = [mv for mv in self.match_results.matched_variants if mv.is_risk_allele]
-
-        # Count genes requiring additional testing
-        genes_needing_testing = [g for g in self.genes if not g.ancestry_compatibility]
+        # Risk alleles and genes requiring additional testing
+        risk_variants = self.grouping.risk_variants
+        genes_needing_testing = self.grouping.genes_needing_testing
 
-        return f"""## Summary & Recommendations
+        yield f"""## Summary & Recommendations
 
 ### Overall Findings
 
@@ -691,13 +2949,17 @@ This DNA analysis report examined {len(self.genes)} genes across {len(self.categ
 
 ### Risk Alleles
 
-{self._format_risk_alleles(risk_variants)}
+"""
+        yield self._format_risk_alleles(risk_variants)
+        yield """
 
 ### Genes Requiring Additional Testing
 
 The following genes have variants that may not be tested by Ancestry.com:
 
-{self._format_genes_needing_testing(genes_needing_testing)}
+"""
+        yield self._format_genes_needing_testing(genes_needing_testing)
+        yield """
 
 ### Recommendations
 
@@ -749,9 +3011,9 @@ The following genes have variants that may not be tested by Ancestry.com:
 
         return text
 
-    def _generate_disclaimer(self) -> str:
+    def _generate_disclaimer(self) -> Iterator[str]:
         """Generate disclaimer section."""
-        return """## Disclaimer
+        yield """## Disclaimer
 
 **Important Notice:**
 
@@ -789,55 +3051,1862 @@ For questions or feedback, please refer to the project documentation.
 """.format(timestamp=datetime.now().strftime('%Y-%m-%d %H:%M:%S UTC'))
 
 
+# ============================================================================
+# Result Export
+# ============================================================================
+
+def canonical_sample_path(dna_file_path: str) -> str:
+    """Return the id that exports and the results database use for a sample."""
+    return os.path.abspath(dna_file_path)
+
+
+class ResultExporter:
+    """
+    Base class for one machine-readable output format.
+
+    An exporter writes the match results and category statistics held by a
+    ReportGenerator, without rendering any Markdown. Its files are named
+    after the report path with the report's extension replaced.
+    """
+
+    name = ''
+    description = ''
+
+    @classmethod
+    def available(cls) -> bool:
+        """Return True if the libraries this format needs are installed."""
+        return True
+
+    def export(self, report: 'ReportGenerator', base_path: str) -> List[str]:
+        """
+        Write the results of one sample.
+
+        Args:
+            report: Report whose genes, match results and category stats
+                are exported.
+            base_path: Report path without its extension.
+
+        Returns:
+            Paths of the files written.
+        """
+        raise NotImplementedError
+
+    @staticmethod
+    def sample_columns(report: 'ReportGenerator') -> Dict[str, List[Any]]:
+        """Return sample-wide totals as one-row columns."""
+        results = report.match_results
+        return {
+            'sample': [canonical_sample_path(report.dna_file_path)],
+            'genes': [len(report.genes)],
+            'variants_checked': [results.total_variants_checked],
+            'variants_found': [results.total_variants_found],
+            'coverage_percentage': [results.coverage_percentage],
+            'genes_with_matches': [len(results.genes_with_matches)],
+            'genes_without_matches': [len(results.genes_without_matches)],
+            'variants_found_by_merged_rsid': [results.variants_found_by_merged_rsid],
+            'variants_found_by_position': [results.variants_found_by_position]
+        }
+
+    @staticmethod
+    def category_columns(report: 'ReportGenerator') -> Dict[str, List[Any]]:
+        """Return one row per category: report order first, then any others."""
+        categories = [category for category in report.CATEGORY_ORDER if category in report.category_stats]
+        categories += sorted(set(report.category_stats) - set(categories))
+        stats = [report.category_stats[category] for category in categories]
+        return {
+            'sample': [canonical_sample_path(report.dna_file_path)] * len(stats),
+            'category': categories,
+            'category_name': [cs.category_name for cs in stats],
+            'total_genes': [cs.total_genes for cs in stats],
+            'variants_checked': [cs.total_variants_checked for cs in stats],
+            'variants_found': [cs.total_variants_found for cs in stats],
+            'coverage_percentage': [cs.coverage_percentage for cs in stats],
+            'genes_with_matches': [cs.genes_with_matches for cs in stats],
+            'genes_without_matches': [cs.genes_without_matches for cs in stats]
+        }
+
+    @staticmethod
+    def match_columns(report: 'ReportGenerator') -> Dict[str, List[Any]]:
+        """Return one row per matched variant, with the full interpretation."""
+        matches = report.match_results.matched_variants
+        genes = [mv.gene for mv in matches]
+        variants = [mv.variant for mv in matches]
+
+        def column(items: List[Any], name: str) -> List[Any]:
+            return list(map(operator.attrgetter(name), items))
+
+        return {
+            'sample': [canonical_sample_path(report.dna_file_path)] * len(matches),
+            'category': column(genes, 'category'),
+            'gene': column(genes, 'symbol'),
+            'gene_id': column(genes, 'gene_id'),
+            'variant': column(variants, 'variant'),
+            'rsid': column(variants, 'rsid'),
+            'chromosome': column(variants, 'chromosome'),
+            'position': column(variants, 'position'),
+            'genotype': column(matches, 'genotype'),
+            'genotype_type': column(matches, 'genotype_type'),
+            'is_risk_allele': column(matches, 'is_risk_allele'),
+            'risk_allele': column(variants, 'risk_allele'),
+            'risk_allele_dosage': column(matches, 'risk_allele_dosage'),
+            'interpretation': column(matches, 'interpretation')
+        }
+
+
+RESULT_EXPORTERS: Dict[str, type] = {}
+
+
+def register_exporter(exporter_cls: type) -> type:
+    """Class decorator adding a ResultExporter to the export registry."""
+    RESULT_EXPORTERS[exporter_cls.name] = exporter_cls
+    return exporter_cls
+
+
+def exporter_for_format(name: str) -> ResultExporter:
+    """Return an exporter instance by format name."""
+    exporter_cls = RESULT_EXPORTERS.get(name)
+    if exporter_cls is None:
+        raise ValueError(f"Unknown export format: {name}")
+    if not exporter_cls.available():
+        raise ValueError(f"Export format {name} is not available: {exporter_cls.description}")
+    return exporter_cls()
+
+
+def export_results(report: 'ReportGenerator', output_path: str, formats: Sequence[str]) -> List[str]:
+    """
+    Write the report's results in every requested export format.
+
+    Returns:
+        Paths of the files written.
+    """
+    base_path = os.path.splitext(output_path)[0]
+    written = []
+    for name in formats:
+        written.extend(exporter_for_format(name).export(report, base_path))
+    return written
+
+
+@register_exporter
+class JSONLinesExporter(ResultExporter):
+    """One JSON object per line: the sample, then each category, then each match."""
+
+    name = 'jsonl'
+    description = 'JSON Lines'
+
+    def export(self, report: 'ReportGenerator', base_path: str) -> List[str]:
+        path = base_path + '.jsonl'
+        with open(path, 'w', encoding='utf-8', buffering=ReportGenerator.WRITE_BUFFER_SIZE) as f:
+            self._write_rows(f, 'sample', self.sample_columns(report))
+            self._write_rows(f, 'category', self.category_columns(report))
+            self._write_rows(f, 'match', self.match_columns(report))
+        return [path]
+
+    @classmethod
+    def _write_rows(cls, f: TextIO, row_type: str, columns: Dict[str, List[Any]]):
+        """Write one JSON object per row, encoding each column in bulk."""
+        template = (
+            f'{{{{"type": "{row_type}", '
+            + ', '.join(f'{encode_basestring_ascii(name)}: {{}}' for name in columns)
+            + '}}\n'
+        )
+        f.writelines(map(template.format, *map(cls._encode_column, columns.values())))
+
+    @staticmethod
+    def _encode_column(values: List[Any]) -> List[str]:
+        """Encode a column of JSON scalars, one C-level map per column type."""
+        kinds = set(map(type, values))
+        if kinds <= {str}:
+            return list(map(encode_basestring_ascii, values))
+        if kinds <= {str, type(None)}:
+            return ['null' if value is None else encode_basestring_ascii(value) for value in values]
+        if kinds <= {bool}:
+            return list(map(('false', 'true').__getitem__, values))
+        if kinds <= {int}:
+            return list(map(int.__repr__, values))
+        if kinds <= {float}:
+            return list(map(float.__repr__, values))
+        return list(map(json.dumps, values))
+
+
+class ArrowTableExporter(ResultExporter):
+    """
+    Base class for columnar formats written with pyarrow.
+
+    Categories and matches go to separate files, so that tables from many
+    samples can be concatenated and queried as one dataset.
+    """
+
+    description = 'needs pyarrow (pip install pyarrow)'
+    extension = ''
+
+    @classmethod
+    def available(cls) -> bool:
+        # Checked without importing pyarrow, which is slow to import
+        return importlib.util.find_spec('pyarrow') is not None
+
+    def export(self, report: 'ReportGenerator', base_path: str) -> List[str]:
+        import pyarrow
+
+        written = []
+        for table_name, columns in (
+            ('categories', self.category_columns(report)),
+            ('matches', self.match_columns(report))
+        ):
+            path = f"{base_path}.{table_name}{self.extension}"
+            self.write_table(pyarrow.table(columns), path)
+            written.append(path)
+        return written
+
+    def write_table(self, table: Any, path: str):
+        """Write one pyarrow table."""
+        raise NotImplementedError
+
+
+@register_exporter
+class ParquetExporter(ArrowTableExporter):
+    """Parquet files, one per table."""
+
+    name = 'parquet'
+    extension = '.parquet'
+
+    def write_table(self, table: Any, path: str):
+        import pyarrow.parquet
+
+        pyarrow.parquet.write_table(table, path)
+
+
+@register_exporter
+class ArrowExporter(ArrowTableExporter):
+    """Arrow IPC (Feather v2) files, one per table."""
+
+    name = 'arrow'
+    extension = '.arrow'
+
+    def write_table(self, table: Any, path: str):
+        import pyarrow.feather
+
+        pyarrow.feather.write_feather(table, path)
+
+
+# ============================================================================
+# Results Database
+# ============================================================================
+
+class ResultDatabase:
+    """
+    SQLite store of the gene catalog and of every sample's matched calls.
+
+    GeneCatalogLoader writes the genes and variants, VariantMatcher writes
+    the calls of each sample it matches. Questions such as "which samples
+    carry a risk allele in category X" then become indexed queries instead
+    of pipeline reruns. The database runs in WAL mode, so it can be queried
+    while batch workers write to it, one transaction per catalog or sample.
+
+    Calls refer to variants by their index within the gene, which only holds
+    for the catalog they were matched against. A catalog change therefore
+    marks every stored sample stale until it is analyzed again, and the
+    query helpers skip stale samples.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS meta (
+            key TEXT PRIMARY KEY,
+            value TEXT NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS genes (
+            gene_id INTEGER PRIMARY KEY,
+            symbol TEXT NOT NULL,
+            full_name TEXT NOT NULL,
+            category TEXT NOT NULL,
+            function TEXT NOT NULL,
+            ancestry_compatibility INTEGER NOT NULL,
+            sha256 TEXT
+        );
+        CREATE TABLE IF NOT EXISTS variants (
+            gene_id INTEGER NOT NULL,
+            variant_idx INTEGER NOT NULL,
+            variant TEXT NOT NULL,
+            rsid TEXT NOT NULL,
+            chromosome TEXT NOT NULL,
+            position INTEGER NOT NULL,
+            risk_allele TEXT,
+            description TEXT NOT NULL,
+            PRIMARY KEY (gene_id, variant_idx)
+        );
+        CREATE TABLE IF NOT EXISTS samples (
+            sample_id INTEGER PRIMARY KEY,
+            dna_file_path TEXT NOT NULL UNIQUE,
+            analyzed_at TEXT NOT NULL,
+            variants_checked INTEGER NOT NULL,
+            variants_found INTEGER NOT NULL,
+            stale INTEGER NOT NULL DEFAULT 0
+        );
+        CREATE TABLE IF NOT EXISTS calls (
+            sample_id INTEGER NOT NULL,
+            gene_id INTEGER NOT NULL,
+            variant_idx INTEGER NOT NULL,
+            rsid TEXT NOT NULL,
+            genotype TEXT NOT NULL,
+            genotype_type TEXT NOT NULL,
+            is_risk_allele INTEGER NOT NULL,
+            risk_allele_dosage INTEGER NOT NULL,
+            PRIMARY KEY (sample_id, gene_id, variant_idx)
+        );
+        CREATE INDEX IF NOT EXISTS genes_category ON genes (category);
+        CREATE INDEX IF NOT EXISTS genes_symbol ON genes (symbol);
+        CREATE INDEX IF NOT EXISTS variants_rsid ON variants (rsid);
+        CREATE INDEX IF NOT EXISTS variants_position ON variants (chromosome, position);
+        CREATE INDEX IF NOT EXISTS calls_rsid ON calls (rsid);
+        CREATE INDEX IF NOT EXISTS calls_gene ON calls (gene_id, is_risk_allele);
+    """
+
+    def __init__(self, path: str):
+        """
+        Args:
+            path: Database file, created with the schema if missing.
+        """
+        self.path = path
+        # Scheduler phases hand the database from thread to thread, but
+        # only ever use it from one thread at a time
+        self.connection = sqlite3.connect(path, timeout=60, check_same_thread=False)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute('PRAGMA synchronous=NORMAL')
+        self.connection.executescript(self.SCHEMA)
+        columns = {row[1] for row in self.connection.execute('PRAGMA table_info(samples)')}
+        if 'stale' not in columns:
+            # Databases written before samples had a stale flag
+            with self.connection:
+                self.connection.execute('ALTER TABLE samples ADD COLUMN stale INTEGER NOT NULL DEFAULT 0')
+
+    def close(self):
+        """Close the connection."""
+        self.connection.close()
+
+    def write_catalog(self, genes: List[Gene], gene_hashes: Sequence[Optional[str]]):
+        """
+        Replace the stored catalog, unless it is unchanged since the last write.
+
+        Samples stored for the previous catalog are marked stale.
+
+        Args:
+            genes: Loaded genes.
+            gene_hashes: Content hash of every gene, aligned with genes.
+
+        Raises:
+            ValueError: If genes share a gene_id, i.e. the same symbol is
+                declared twice in one category. Rows are keyed by gene_id,
+                so one would silently replace the other.
+        """
+        counts = Counter(gene.gene_id for gene in genes)
+        duplicates = sorted({
+            f"{gene.category}/{gene.symbol}" for gene in genes if counts[gene.gene_id] > 1
+        })
+        if duplicates:
+            raise ValueError(f"Genes declared more than once: {', '.join(duplicates)}")
+
+        fingerprint = hashlib.sha256('\n'.join(map(str, gene_hashes)).encode('utf-8')).hexdigest()
+        row = self.connection.execute("SELECT value FROM meta WHERE key = 'catalog'").fetchone()
+        if row is not None and row[0] == fingerprint:
+            return
+
+        with self.connection:
+            self.connection.execute('UPDATE samples SET stale = 1')
+            self.connection.execute('DELETE FROM variants')
+            self.connection.execute('DELETE FROM genes')
+            self.connection.executemany(
+                'INSERT OR REPLACE INTO genes VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (
+                    (gene.gene_id, gene.symbol, gene.full_name, gene.category, gene.function,
+                     int(gene.ancestry_compatibility), sha256)
+                    for gene, sha256 in zip(genes, gene_hashes)
+                )
+            )
+            self.connection.executemany(
+                'INSERT OR REPLACE INTO variants VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                (
+                    (gene.gene_id, variant_idx, variant.variant, variant.rsid, variant.chromosome,
+                     variant.position, variant.risk_allele, variant.description)
+                    for gene in genes
+                    for variant_idx, variant in enumerate(gene.tracked_variants())
+                )
+            )
+            self.connection.execute("INSERT OR REPLACE INTO meta VALUES ('catalog', ?)", (fingerprint,))
+        logger.info("Stored %d genes in database: %s", len(genes), self.path)
+        (stale,) = self.connection.execute('SELECT COUNT(*) FROM samples WHERE stale = 1').fetchone()
+        if stale:
+            logger.warning("%d stored samples predate this catalog and are marked stale until re-analyzed", stale)
+
+    def write_sample(self, dna_file_path: str, match_results: MatchResults):
+        """Replace the stored calls of one sample with its match results."""
+        sample = canonical_sample_path(dna_file_path)
+        with self.connection:
+            self.connection.execute(
+                'INSERT INTO samples (dna_file_path, analyzed_at, variants_checked, variants_found, stale) '
+                'VALUES (?, ?, ?, ?, 0) ON CONFLICT (dna_file_path) DO UPDATE SET '
+                'analyzed_at = excluded.analyzed_at, variants_checked = excluded.variants_checked, '
+                'variants_found = excluded.variants_found, stale = 0',
+                (sample, datetime.now().isoformat(timespec='seconds'),
+                 match_results.total_variants_checked, match_results.total_variants_found)
+            )
+            (sample_id,) = self.connection.execute(
+                'SELECT sample_id FROM samples WHERE dna_file_path = ?', (sample,)
+            ).fetchone()
+            self.connection.execute('DELETE FROM calls WHERE sample_id = ?', (sample_id,))
+            self.connection.executemany(
+                'INSERT OR REPLACE INTO calls VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                (
+                    (sample_id, mv.gene.gene_id, mv.variant_idx, mv.variant.rsid, mv.genotype,
+                     mv.genotype_type, int(mv.is_risk_allele), mv.risk_allele_dosage)
+                    for mv in match_results.matched_variants
+                )
+            )
+
+    def samples_with_risk_allele(self, category: str) -> List[Tuple[str, str, str, str]]:
+        """
+        Return (sample, gene symbol, rsid, genotype) for every risk allele
+        call in a category, from samples that are not stale.
+        """
+        return self.connection.execute(
+            'SELECT samples.dna_file_path, genes.symbol, calls.rsid, calls.genotype '
+            'FROM genes JOIN calls ON calls.gene_id = genes.gene_id AND calls.is_risk_allele = 1 '
+            'JOIN samples ON samples.sample_id = calls.sample_id AND samples.stale = 0 '
+            'WHERE genes.category = ? ORDER BY samples.dna_file_path, genes.symbol, calls.rsid',
+            (category,)
+        ).fetchall()
+
+    def stale_samples(self) -> List[str]:
+        """Return the samples whose calls predate the stored catalog."""
+        return [
+            row[0] for row in self.connection.execute(
+                'SELECT dna_file_path FROM samples WHERE stale = 1 ORDER BY dna_file_path'
+            )
+        ]
+
+    def variants_on_chromosome(self, chromosome: str) -> List[Tuple[str, str, int, str]]:
+        """Return (gene symbol, rsid, position, variant) for a chromosome, by position."""
+        return self.connection.execute(
+            'SELECT genes.symbol, variants.rsid, variants.position, variants.variant '
+            'FROM variants JOIN genes ON genes.gene_id = variants.gene_id '
+            'WHERE variants.chromosome = ? ORDER BY variants.position',
+            (chromosome,)
+        ).fetchall()
+
+
+# ============================================================================
+# Cohort Genotype Matrix
+# ============================================================================
+
+class CohortMatrix:
+    """
+    Dense samples x catalog-variants genotype matrix kept on disk.
+
+    The cohort directory holds three files:
+        genotypes.u8 - row-major packed genotype codes, one row per sample
+        samples.txt  - row index, one sample id per line
+        variants.txt - column index, one rsid per line
+
+    Rows are appended as samples are added, and queries memory-map the
+    matrix and work on whole columns with C-level bytes operations.
+    """
+
+    MATRIX_NAME = 'genotypes.u8'
+    SAMPLES_NAME = 'samples.txt'
+    VARIANTS_NAME = 'variants.txt'
+
+    def __init__(self, cohort_dir: str, rsids: Optional[List[str]] = None):
+        """
+        Open a cohort matrix, creating it when it does not exist yet.
+
+        Args:
+            cohort_dir: Directory holding the matrix and its index files.
+            rsids: Column rsids for a new matrix. For an existing matrix
+                they must match the stored columns when given.
+        """
+        self.cohort_dir = cohort_dir
+        self.matrix_path = os.path.join(cohort_dir, self.MATRIX_NAME)
+        self.samples_path = os.path.join(cohort_dir, self.SAMPLES_NAME)
+        variants_path = os.path.join(cohort_dir, self.VARIANTS_NAME)
+
+        if os.path.exists(variants_path):
+            with open(variants_path, 'r', encoding='utf-8') as f:
+                self.rsids = f.read().split()
+            if rsids is not None and list(rsids) != self.rsids:
+                raise ValueError(
+                    f"Cohort {cohort_dir} was built for a different variant set; "
+                    "use a new cohort directory after changing the catalog"
+                )
+        elif rsids is not None:
+            os.makedirs(cohort_dir, exist_ok=True)
+            self.rsids = list(rsids)
+            with open(variants_path, 'w', encoding='utf-8') as f:
+                f.write(''.join(f"{rsid}\n" for rsid in self.rsids))
+            open(self.matrix_path, 'wb').close()
+            open(self.samples_path, 'w').close()
+        else:
+            raise FileNotFoundError(f"Cohort matrix not found: {cohort_dir}")
+
+        self.columns = {rsid: idx for idx, rsid in enumerate(self.rsids)}
+        with open(self.samples_path, 'r', encoding='utf-8') as f:
+            # One id per line; ids are file names and may contain spaces
+            self.samples = f.read().splitlines()
+        self._sample_rows = {sample: idx for idx, sample in enumerate(self.samples)}
+
+    @staticmethod
+    def genotype_row(genotypes: Mapping, rsids: List[str]) -> bytes:
+        """Encode one sample's genotypes for the given columns."""
+        if isinstance(genotypes, GenotypeStore):
+            return bytes(map(genotypes.allele_code, rsids))
+
+        row = bytearray(MISSING_GENOTYPE for _ in rsids)
+        for idx, rsid in enumerate(rsids):
+            genotype = genotypes.get(rsid)
+            if genotype is not None:
+                row[idx] = (ALLELE_CODES[genotype.allele1.upper()] << 4) | ALLELE_CODES[genotype.allele2.upper()]
+        return bytes(row)
+
+    def add_sample(self, sample_id: str, row: bytes):
+        """Append a sample's row, or overwrite it if the sample is already present."""
+        if len(row) != len(self.rsids):
+            raise ValueError(f"Row has {len(row)} columns, cohort has {len(self.rsids)}")
+        if '\n' in sample_id or '\r' in sample_id:
+            raise ValueError(f"Sample id contains a line break: {sample_id!r}")
+
+        existing = self._sample_rows.get(sample_id)
+        if existing is not None:
+            with open(self.matrix_path, 'r+b') as f:
+                f.seek(existing * len(self.rsids))
+                f.write(row)
+            return
+
+        with open(self.matrix_path, 'ab') as f:
+            f.write(row)
+        with open(self.samples_path, 'a', encoding='utf-8') as f:
+            f.write(f"{sample_id}\n")
+        self._sample_rows[sample_id] = len(self.samples)
+        self.samples.append(sample_id)
+
+    def column(self, rsid: str) -> bytes:
+        """Return the genotype codes of every sample for one rsid."""
+        col = self.columns[rsid]
+        width = len(self.rsids)
+        rows = len(self.samples)
+        if rows == 0 or width == 0:
+            return b''
+
+        with open(self.matrix_path, 'rb') as f:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as matrix:
+                return matrix[col:rows * width:width]
+
+    def genotype_counts(self, rsid: str) -> Dict[str, int]:
+        """Count samples per genotype for an rsid; absent calls are skipped."""
+        column = self.column(rsid)
+        return {
+            genotype_from_code(code): column.count(code)
+            for code in sorted(set(column)) if code != MISSING_GENOTYPE
+        }
+
+    def allele_counts(self, rsid: str) -> Dict[str, int]:
+        """Count called alleles for an rsid across the cohort."""
+        counts: Counter = Counter()
+        for genotype, count in self.genotype_counts(rsid).items():
+            for allele in genotype:
+                if allele != '0':
+                    counts[allele] += count
+        return dict(counts)
+
+    def allele_frequencies(self, rsid: str) -> Dict[str, float]:
+        """Return the frequency of each called allele for an rsid."""
+        counts = self.allele_counts(rsid)
+        total = sum(counts.values())
+        if total == 0:
+            return {}
+        return {allele: count / total for allele, count in counts.items()}
+
+    def carriers(self, rsid: str, allele: str) -> List[str]:
+        """Return the ids of samples carrying at least one copy of an allele."""
+        code = ALLELE_CODES[allele.upper()]
+        table = bytes(
+            1 if value != MISSING_GENOTYPE and code in (value >> 4, value & 0x0F) else 0
+            for value in range(256)
+        )
+        return list(compress(self.samples, self.column(rsid).translate(table)))
+
+
+# ============================================================================
+# Incremental Re-analysis
+# ============================================================================
+
+class IncrementalReporter:
+    """
+    Keeps sample reports current with the catalog, redoing only what changed.
+
+    Reports written here carry section markers and a JSON state sidecar.
+    The sidecar records, per category, a digest of the content hashes of
+    the category's genes and the genotype codes of its matched variants.
+    On later runs, categories with an unchanged digest are neither matched
+    nor rendered again: their hits come from the state and their section
+    text is copied from the existing report. Genotypes are only loaded when
+    some category changed. A change to the DNA file or to the matching
+    options redoes the whole report.
+    """
+
+    STATE_SUFFIX = '.state.json'
+    STATE_VERSION = 1
+
+    # How update() brought a report up to date
+    FULL = 'full'
+    PATCHED = 'patched'
+    UNCHANGED = 'unchanged'
+
+    def __init__(
+        self,
+        index: CatalogIndex,
+        gene_hashes: List[str],
+        position_match: Optional[str] = None,
+        merge_table: Optional[RsidMergeTable] = None,
+        exclude_no_calls: bool = False
+    ):
+        """
+        Args:
+            index: Catalog index of the current catalog.
+            gene_hashes: Content hash of every gene, aligned with
+                index.genes (see GeneCatalogLoader.gene_hashes).
+            position_match: Positional fallback mode for VariantMatcher.
+            merge_table: Rsid merge history for VariantMatcher.
+            exclude_no_calls: Whether the genotypes exclude no-calls.
+        """
+        self.index = index
+        self.genes = index.genes
+        self.position_match = position_match
+        self.merge_table = merge_table
+        self.options = {
+            'position_match': position_match,
+            'merge_table': getattr(merge_table, 'header', None),
+            'exclude_no_calls': exclude_no_calls
+        }
+
+        # Genes of each category, and each gene's position within its category
+        self.category_genes: Dict[str, List[int]] = {}
+        self.category_positions: List[int] = []
+        for gene_idx, gene in enumerate(self.genes):
+            members = self.category_genes.setdefault(gene.category, [])
+            self.category_positions.append(len(members))
+            members.append(gene_idx)
+
+        self.category_digests = {
+            category: hashlib.sha256(
+                '\n'.join(gene_hashes[gene_idx] for gene_idx in members).encode('utf-8')
+            ).hexdigest()
+            for category, members in self.category_genes.items()
+        }
+
+    def update(
+        self,
+        dna_file_path: str,
+        output_path: str,
+        load_genotypes: Callable[[], Mapping[str, Genotype]]
+    ) -> Tuple[str, MatchResults]:
+        """
+        Bring the report at output_path up to date with the catalog.
+
+        Args:
+            dna_file_path: Sample DNA file.
+            output_path: Report path; its state sidecar sits next to it.
+            load_genotypes: Returns the sample's genotypes; only called
+                when some category has to be matched again.
+
+        Returns:
+            Tuple of (FULL, PATCHED or UNCHANGED, match results).
+        """
+        stat = os.stat(dna_file_path)
+        state = self._read_state(output_path)
+        sections = ReportGenerator.read_sections(output_path) if state is not None else None
+
+        if (
+            state is None
+            or sections is None
+            or state.get('source_size') != stat.st_size
+            or state.get('source_mtime_ns') != stat.st_mtime_ns
+            or state.get('options') != self.options
+        ):
+            mode = self.FULL
+            cached: Dict[str, Dict[str, Any]] = {}
+            stale = set(self.category_digests)
+        else:
+            cached = state['categories']
+            stale = {
+                category for category, digest in self.category_digests.items()
+                if cached.get(category, {}).get('digest') != digest
+            }
+            mode = self.UNCHANGED if not stale and set(cached) == set(self.category_digests) else self.PATCHED
+
+        # Hits of unchanged categories come from the state
+        hits: List[Tuple[int, int, int]] = []
+        for category, members in self.category_genes.items():
+            if category not in stale:
+                hits.extend(
+                    (members[position], variant_idx, code)
+                    for position, variant_idx, code in cached[category]['hits']
+                )
+
+        if stale:
+            if mode == self.PATCHED:
+                logger.info("Matching %d changed categories for %s", len(stale), dna_file_path)
+            hits.extend(self._match(load_genotypes(), stale))
+
+        results = VariantMatcher.results_from_hits(self.index, hits)
+        if mode == self.UNCHANGED:
+            return mode, results
+
+        generator = ReportGenerator(self.genes, results, dna_file_path, section_markers=True)
+        if mode == self.PATCHED:
+            for category in self.category_digests.keys() - stale:
+                section_id = ReportGenerator.category_section_id(category)
+                if section_id in sections:
+                    generator.reused_sections[section_id] = sections[section_id]
+        generator.generate(output_path)
+        self._write_state(output_path, stat, hits)
+        return mode, results
+
+    def _match(self, genotypes: Mapping[str, Genotype], categories: Set[str]) -> List[Tuple[int, int, int]]:
+        """Match the genes of the given categories; hits use catalog-wide gene indexes."""
+        if len(categories) == len(self.category_genes):
+            members = list(range(len(self.genes)))
+            index = self.index
+        else:
+            members = sorted(
+                gene_idx for category in categories for gene_idx in self.category_genes.get(category, [])
+            )
+            index = CatalogIndex([self.genes[gene_idx] for gene_idx in members])
+
+        matcher = VariantMatcher(genotypes, index, self.position_match, self.merge_table)
+        return [(members[gene_idx], variant_idx, code) for gene_idx, variant_idx, code in matcher.find_hits(index)]
+
+    def _read_state(self, output_path: str) -> Optional[Dict[str, Any]]:
+        """Read the state sidecar of a report, or None if missing or stale."""
+        try:
+            with open(output_path + self.STATE_SUFFIX, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if not isinstance(state, dict) or state.get('version') != self.STATE_VERSION:
+            return None
+        return state
+
+    def _write_state(self, output_path: str, stat: os.stat_result, hits: List[Tuple[int, int, int]]):
+        """Write the state sidecar for a freshly written report."""
+        categories = {
+            category: {'digest': digest, 'hits': []}
+            for category, digest in self.category_digests.items()
+        }
+        for gene_idx, variant_idx, code in sorted(hits):
+            categories[self.genes[gene_idx].category]['hits'].append(
+                [self.category_positions[gene_idx], variant_idx, code]
+            )
+
+        state = {
+            'version': self.STATE_VERSION,
+            'source_size': stat.st_size,
+            'source_mtime_ns': stat.st_mtime_ns,
+            'options': self.options,
+            'categories': categories
+        }
+        tmp_path = f"{output_path}{self.STATE_SUFFIX}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(state, f, separators=(',', ':'))
+        os.replace(tmp_path, output_path + self.STATE_SUFFIX)
+
+
+# ============================================================================
+# Batch Engine
+# ============================================================================
+
+@dataclass
+class SampleResult:
+    """Outcome of analyzing one sample in a batch."""
+    dna_file_path: str
+    output_path: str
+    success: bool
+    elapsed_seconds: float
+    variants_found: int = 0
+    variants_checked: int = 0
+    error: str = ''
+    genotype_row: Optional[bytes] = None
+    phases: List[Dict[str, Any]] = field(default_factory=list)
+    parse_stats: Dict[str, Any] = field(default_factory=dict)
+    # In incremental mode, how the report was brought up to date
+    update: str = ''
+
+
+# Per-process batch state, set once by _init_batch_worker
+_batch_genes: List[Gene] = []
+_batch_index: Optional[CatalogIndex] = None
+_batch_target_rsids: Optional[Set[str]] = None
+_batch_use_cache = True
+_batch_cohort_rsids: Optional[List[str]] = None
+_batch_exclude_no_calls = False
+_batch_min_call_rate = 0.0
+_batch_position_match: Optional[str] = None
+_batch_merge_table: Optional[RsidMergeTable] = None
+_batch_incremental: Optional[IncrementalReporter] = None
+_batch_report_fragments: Dict[str, str] = {}
+_batch_export_formats: Sequence[str] = ()
+_batch_markdown = True
+_batch_database: Optional[ResultDatabase] = None
+
+
+def _init_batch_worker(
+    index: CatalogIndex,
+    target_rsids: Optional[Set[str]],
+    use_cache: bool,
+    cohort_rsids: Optional[List[str]] = None,
+    exclude_no_calls: bool = False,
+    min_call_rate: float = 0.0,
+    position_match: Optional[str] = None,
+    merge_table_path: Optional[str] = None,
+    gene_hashes: Optional[List[str]] = None,
+    export_formats: Sequence[str] = (),
+    markdown: bool = True,
+    database_path: Optional[str] = None
+):
+    """
+    Install the shared catalog and rsid index in a batch worker process.
+
+    With gene_hashes, reports are kept up to date incrementally. With a
+    database_path, every worker stores calls over its own connection.
+    """
+    global _batch_genes, _batch_index, _batch_target_rsids, _batch_use_cache, _batch_cohort_rsids
+    global _batch_exclude_no_calls, _batch_min_call_rate, _batch_position_match, _batch_merge_table
+    global _batch_incremental, _batch_report_fragments, _batch_export_formats, _batch_markdown
+    global _batch_database
+    _batch_genes = index.genes
+    _batch_index = index
+    _batch_target_rsids = target_rsids
+    _batch_use_cache = use_cache
+    _batch_cohort_rsids = cohort_rsids
+    _batch_exclude_no_calls = exclude_no_calls
+    _batch_min_call_rate = min_call_rate
+    _batch_position_match = position_match
+    # Each worker maps the compiled table; the pages are shared between processes
+    _batch_merge_table = RsidMergeTable.open(merge_table_path) if merge_table_path else None
+    _batch_report_fragments = {}
+    _batch_export_formats = export_formats
+    _batch_markdown = markdown
+    _batch_database = ResultDatabase(database_path) if database_path else None
+    _batch_incremental = None
+    if gene_hashes is not None:
+        _batch_incremental = IncrementalReporter(
+            index, gene_hashes, position_match, _batch_merge_table, exclude_no_calls
+        )
+
+
+def _analyze_sample(dna_file_path: str, output_path: str) -> SampleResult:
+    """Parse, match and report one sample using the worker's shared catalog."""
+    start = time.perf_counter()
+    metrics = PipelineMetrics()
+    parse_stats: Dict[str, Any] = {}
+    update = ''
+
+    def parse() -> GenotypeStore:
+        nonlocal parse_stats
+        with metrics.phase('parse') as phase:
+            parser = DNAParser(
+                dna_file_path,
+                target_rsids=_batch_target_rsids,
+                use_cache=_batch_use_cache,
+                exclude_no_calls=_batch_exclude_no_calls,
+                position_index=_batch_position_match is not None
+            )
+            genotypes = parser.parse()
+            phase.rows_processed = parser.lines_read
+            phase.bytes_read = parser.bytes_read
+        parse_stats = parser.stats.to_dict()
+
+        if parser.stats.call_rate < _batch_min_call_rate:
+            raise ValueError(
+                f"call rate {parser.stats.call_rate:.2%} is below the minimum of {_batch_min_call_rate:.2%}"
+            )
+        return genotypes
+
+    try:
+        if not os.path.isfile(dna_file_path):
+            raise FileNotFoundError(f"DNA file not found: {dna_file_path}")
+
+        genotypes = None
+        if _batch_incremental is not None:
+            def load_genotypes() -> GenotypeStore:
+                nonlocal genotypes
+                genotypes = parse()
+                return genotypes
+
+            with metrics.phase('incremental') as phase:
+                update, match_results = _batch_incremental.update(dna_file_path, output_path, load_genotypes)
+                phase.rows_processed = len(match_results.matched_variants)
+            if _batch_database is not None:
+                _batch_database.write_sample(dna_file_path, match_results)
+        else:
+            genotypes = parse()
+
+            with metrics.phase('match') as phase:
+                match_results = VariantMatcher(
+                    genotypes, _batch_index, _batch_position_match, _batch_merge_table,
+                    database=_batch_database, sample=dna_file_path
+                ).match(_batch_genes)
+                phase.rows_processed = match_results.total_variants_checked
+
+            report = ReportGenerator(_batch_genes, match_results, dna_file_path, fragments=_batch_report_fragments)
+            if _batch_markdown:
+                with metrics.phase('report') as phase:
+                    report.generate(output_path)
+                    phase.rows_processed = len(match_results.matched_variants)
+
+        if _batch_export_formats:
+            if _batch_incremental is not None:
+                report = ReportGenerator(_batch_genes, match_results, dna_file_path)
+            with metrics.phase('export') as phase:
+                export_results(report, output_path, _batch_export_formats)
+                phase.rows_processed = len(match_results.matched_variants)
+
+        genotype_row = None
+        if _batch_cohort_rsids is not None:
+            if genotypes is None:
+                genotypes = parse()
+            genotype_row = CohortMatrix.genotype_row(genotypes, _batch_cohort_rsids)
+    except SystemExit:
+        # DNAParser has already logged the reason
+        error = 'aborted (see log output above)'
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+    else:
+        return SampleResult(
+            dna_file_path=dna_file_path,
+            output_path=output_path,
+            success=True,
+            elapsed_seconds=time.perf_counter() - start,
+            variants_found=match_results.total_variants_found,
+            variants_checked=match_results.total_variants_checked,
+            genotype_row=genotype_row,
+            phases=[vars(p) for p in metrics.phases],
+            parse_stats=parse_stats,
+            update=update
+        )
+
+    return SampleResult(
+        dna_file_path=dna_file_path,
+        output_path=output_path,
+        success=False,
+        elapsed_seconds=time.perf_counter() - start,
+        error=error,
+        phases=[vars(p) for p in metrics.phases],
+        parse_stats=parse_stats
+    )
+
+
+class BatchAnalyzer:
+    """Analyzes many DNA files against one catalog load."""
+
+    REPORT_SUFFIX = '-SUMMARY-FROM-RAW-DNA.md'
+
+    def __init__(
+        self,
+        genes: List[Gene],
+        output_dir: str,
+        workers: int = 1,
+        use_cache: bool = True,
+        cohort: Optional[CohortMatrix] = None,
+        exclude_no_calls: bool = False,
+        min_call_rate: float = 0.0,
+        position_match: Optional[str] = None,
+        merge_table: Optional[RsidMergeTable] = None,
+        gene_hashes: Optional[List[str]] = None,
+        export_formats: Sequence[str] = (),
+        markdown: bool = True,
+        database_path: Optional[str] = None
+    ):
+        """
+        Args:
+            genes: Gene catalog, loaded once and shared by every sample.
+            output_dir: Directory that receives one report per sample.
+            workers: Number of worker processes; at most twice this many
+                samples are queued at any time.
+            use_cache: Use the DNA sidecar cache for each sample. Without
+                it, samples are parsed in targeted mode, keeping only the
+                catalog (and cohort) rsids, unless position_match needs
+                every row.
+            cohort: Optional cohort matrix that receives one row per
+                successfully analyzed sample.
+            exclude_no_calls: Leave no-call genotypes out of matching.
+            min_call_rate: Fail samples whose call rate is below this
+                before matching them.
+            position_match: Positional fallback mode passed to
+                VariantMatcher ('lookup' or 'merge').
+            merge_table: Compiled rsid merge history passed to
+                VariantMatcher; workers map it from its path.
+            gene_hashes: Content hash of every gene (see
+                GeneCatalogLoader.gene_hashes). When given, existing
+                reports are updated incrementally by IncrementalReporter.
+            export_formats: RESULT_EXPORTERS formats written next to
+                each report.
+            markdown: Write the Markdown report; without it only the
+                export formats are written.
+            database_path: Results database that receives the calls of
+                every sample (see ResultDatabase).
+        """
+        self.genes = genes
+        self.output_dir = output_dir
+        self.workers = max(1, workers)
+        self.use_cache = use_cache
+        self.cohort = cohort
+        self.exclude_no_calls = exclude_no_calls
+        self.min_call_rate = min_call_rate
+        self.position_match = position_match
+        self.merge_table = merge_table
+        self.gene_hashes = gene_hashes
+        self.export_formats = tuple(export_formats)
+        self.markdown = markdown
+        self.database_path = database_path
+        self.index = GeneCatalogLoader.build_index(genes)
+        # The cache and the positional fallback both parse every row
+        self.target_rsids: Optional[Set[str]] = None
+        if not use_cache and position_match is None:
+            self.target_rsids = GeneCatalogLoader.collect_rsids(genes, merge_table)
+            if cohort is not None:
+                self.target_rsids |= set(cohort.rsids)
+
+    def sample_names(self, dna_file_paths: List[str]) -> List[str]:
+        """Choose a unique sample name per file, based on the file name."""
+        names = []
+        used: Set[str] = set()
+        for dna_file_path in dna_file_paths:
+            source = Path(dna_file_path)
+            name = source.stem
+            if source.suffix.lower() in COMPRESSED_SUFFIXES:
+                name = Path(name).stem
+            if name in used:
+                name = f"{source.parent.name}-{name}"
+            base, counter = name, 2
+            while name in used:
+                name = f"{base}-{counter}"
+                counter += 1
+            used.add(name)
+            names.append(name)
+        return names
+
+    def output_paths(self, dna_file_paths: List[str]) -> List[str]:
+        """Return the report path for each sample."""
+        return [
+            os.path.join(self.output_dir, name + self.REPORT_SUFFIX)
+            for name in self.sample_names(dna_file_paths)
+        ]
+
+    def worker_initargs(self) -> Tuple[Any, ...]:
+        """Return the _init_batch_worker arguments for this batch."""
+        return (
+            self.index, self.target_rsids, self.use_cache,
+            self.cohort.rsids if self.cohort is not None else None,
+            self.exclude_no_calls, self.min_call_rate, self.position_match,
+            self.merge_table.path if self.merge_table is not None else None,
+            self.gene_hashes, self.export_formats, self.markdown, self.database_path
+        )
+
+    def run(self, dna_file_paths: List[str]) -> List[SampleResult]:
+        """
+        Analyze every sample and write its report.
+
+        Returns:
+            One SampleResult per input file, in input order.
+        """
+        os.makedirs(self.output_dir, exist_ok=True)
+        jobs = list(zip(dna_file_paths, self.output_paths(dna_file_paths)))
+        initargs = self.worker_initargs()
+
+        logger.info("Analyzing %d samples with %d workers", len(jobs), self.workers)
+
+        if self.workers == 1:
+            _init_batch_worker(*initargs)
+            results = [_analyze_sample(*job) for job in jobs]
+            for result in results:
+                self._add_to_cohort(result)
+            return results
+
+        results: Dict[int, SampleResult] = {}
+        job_iter = iter(enumerate(jobs))
+        in_flight = {}
+
+        with ProcessPoolExecutor(
+            max_workers=self.workers,
+            initializer=_init_batch_worker,
+            initargs=initargs
+        ) as executor:
+            while True:
+                # Keep the queue bounded so thousands of kits don't pile up
+                while len(in_flight) < 2 * self.workers:
+                    job = next(job_iter, None)
+                    if job is None:
+                        break
+                    index, (dna_file_path, output_path) = job
+                    in_flight[executor.submit(_analyze_sample, dna_file_path, output_path)] = job
+
+                if not in_flight:
+                    break
+
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    index, (dna_file_path, output_path) = in_flight.pop(future)
+                    try:
+                        results[index] = future.result()
+                    except Exception as e:
+                        results[index] = SampleResult(
+                            dna_file_path=dna_file_path,
+                            output_path=output_path,
+                            success=False,
+                            elapsed_seconds=0.0,
+                            error=f"{type(e).__name__}: {e}"
+                        )
+                    self._add_to_cohort(results[index])
+
+        return [results[index] for index in range(len(jobs))]
+
+    def _add_to_cohort(self, result: SampleResult):
+        """
+        Write a finished sample into the cohort matrix, if one is configured.
+
+        Rows are keyed by canonical_sample_path(), the sample id used by the
+        exports and the results database.
+        """
+        if self.cohort is not None and result.genotype_row is not None:
+            self.cohort.add_sample(canonical_sample_path(result.dna_file_path), result.genotype_row)
+            result.genotype_row = None
+
+    @staticmethod
+    def log_summary(results: List[SampleResult]):
+        """Log per-sample timings and a failure summary."""
+        logger.info("Batch Summary")
+        logger.info("-" * 70)
+        for result in results:
+            status = 'OK' if result.success else 'FAILED'
+            detail = (
+                f"{result.variants_found}/{result.variants_checked} variants"
+                if result.success else result.error
+            )
+            logger.info("%-7s %8.2fs  %s  %s", status, result.elapsed_seconds, result.dna_file_path, detail)
+
+        failures = [r for r in results if not r.success]
+        total_time = sum(r.elapsed_seconds for r in results)
+        logger.info("")
+        logger.info("Samples: %d, succeeded: %d, failed: %d", len(results), len(results) - len(failures), len(failures))
+        logger.info("Total sample time: %.2fs", total_time)
+        updates = Counter(r.update for r in results if r.update)
+        if updates:
+            logger.info(
+                "Incremental: %s",
+                ', '.join(f"{count} {update}" for update, count in sorted(updates.items()))
+            )
+        if failures:
+            logger.info("Failed samples:")
+            for result in failures:
+                logger.info("- %s: %s", result.dna_file_path, result.error)
+
+    @staticmethod
+    def summary_dict(results: List[SampleResult]) -> List[Dict[str, Any]]:
+        """Return per-sample outcomes and phase metrics as plain data."""
+        return [
+            {
+                'dna_file_path': r.dna_file_path,
+                'output_path': r.output_path,
+                'success': r.success,
+                'elapsed_seconds': r.elapsed_seconds,
+                'variants_found': r.variants_found,
+                'variants_checked': r.variants_checked,
+                'error': r.error,
+                'phases': r.phases,
+                'parse_stats': r.parse_stats,
+                'update': r.update
+            }
+            for r in results
+        ]
+
+
+# ============================================================================
+# Analysis Server
+# ============================================================================
+
+class _UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """HTTP over a Unix domain socket, one thread per connection."""
+
+    daemon_threads = True
+
+
+class AnalysisRequestHandler(BaseHTTPRequestHandler):
+    """
+    JSON API of AnalysisServer.
+
+    GET /health returns the server status. POST /analyze takes
+    {"dna_file": path, "output": optional report path, "report": bool} and
+    returns the sample's outcome, plus the report text when "report" is set.
+    "output" is relative to the server's output directory and may not leave it.
+    """
+
+    # Keep connections open so a client can submit many kits on one
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        if self.path != '/health':
+            self._send_json(404, {'error': f"unknown path: {self.path}"})
+            return
+        self._send_json(200, self.server.analysis.status())
+
+    def do_POST(self):
+        if self.path != '/analyze':
+            self._send_json(404, {'error': f"unknown path: {self.path}"})
+            return
+        analysis = self.server.analysis
+        try:
+            body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+            job = json.loads(body or b'{}')
+            if not isinstance(job, dict):
+                raise TypeError('the body is not an object')
+            dna_file_path = job['dna_file']
+            output = job.get('output')
+            include_report = job.get('report', False)
+            if not isinstance(dna_file_path, str) or not dna_file_path:
+                raise TypeError('"dna_file" must be a non-empty string')
+            if output is not None and not isinstance(output, str):
+                raise TypeError('"output" must be a string')
+            if not isinstance(include_report, bool):
+                raise TypeError('"report" must be true or false')
+            output_path = analysis.job_output_path(dna_file_path, output)
+        except (ValueError, KeyError, TypeError) as e:
+            self._send_json(400, {'error': f'invalid request: {e}'})
+            return
+        status, result = analysis.analyze(dna_file_path, output_path, include_report)
+        self._send_json(status, result)
+
+    def _send_json(self, status: int, payload: Dict[str, Any]):
+        data = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format: str, *args: Any):
+        logger.debug("%s", format % args)
+
+
+class AnalysisServer:
+    """
+    Long-running analysis service.
+
+    The catalog, the rsid index and the catalog-only report fragments are
+    loaded once and kept warm in a pool of batch workers. Jobs arrive over
+    localhost HTTP or a Unix socket and run concurrently on that pool, so a
+    kit with a current sidecar cache is analyzed without any start-up cost.
+    """
+
+    def __init__(self, batch: BatchAnalyzer):
+        """
+        Args:
+            batch: Catalog and analysis options shared by every job. Reports
+                without an explicit output path go to its output_dir.
+        """
+        self.batch = batch
+        self.jobs_succeeded = 0
+        self.jobs_failed = 0
+        self._lock = threading.Lock()
+        self._executor: Optional[Union[ThreadPoolExecutor, ProcessPoolExecutor]] = None
+
+    @staticmethod
+    def make_server(address: str, allow_remote: bool = False) -> socketserver.BaseServer:
+        """
+        Bind the HTTP server.
+
+        Args:
+            address: 'unix:PATH' for a Unix socket, otherwise 'HOST:PORT'
+                or just 'PORT' (bound to 127.0.0.1).
+            allow_remote: Allow a HOST that is not a loopback address.
+
+        Raises:
+            ValueError: If the address is malformed, PATH exists and is not
+                a socket, or HOST is not loopback without allow_remote.
+        """
+        if address.startswith('unix:'):
+            path = address[len('unix:'):]
+            try:
+                mode = os.lstat(path).st_mode
+            except FileNotFoundError:
+                pass
+            else:
+                if not S_ISSOCK(mode):
+                    raise ValueError(f"{path} exists and is not a socket")
+                os.remove(path)  # left behind by a previous server
+            return _UnixHTTPServer(path, AnalysisRequestHandler)
+
+        host, _, port = address.rpartition(':')
+        host = host.strip('[]') or '127.0.0.1'
+        if not allow_remote and not AnalysisServer.is_loopback(host):
+            raise ValueError(f"{host} is not a loopback address; use --serve-remote to listen on it")
+        return ThreadingHTTPServer((host, int(port)), AnalysisRequestHandler)
+
+    @staticmethod
+    def is_loopback(host: str) -> bool:
+        """Return True if host is localhost or a loopback IP address."""
+        if host == 'localhost':
+            return True
+        try:
+            return ipaddress.ip_address(host).is_loopback
+        except ValueError:
+            return False
+
+    def start(self):
+        """Start the worker pool and load the catalog into every worker."""
+        os.makedirs(self.batch.output_dir, exist_ok=True)
+        initargs = self.batch.worker_initargs()
+        if self.batch.workers == 1:
+            _init_batch_worker(*initargs)
+            self._executor = ThreadPoolExecutor(max_workers=1)
+            return
+
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.batch.workers,
+            initializer=_init_batch_worker,
+            initargs=initargs
+        )
+        # Start every worker now rather than on the first requests
+        wait([self._executor.submit(os.getpid) for _ in range(self.batch.workers)])
+
+    def stop(self):
+        """Shut the worker pool down."""
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def status(self) -> Dict[str, Any]:
+        """Return what the server has loaded and how many jobs it has run."""
+        with self._lock:
+            return {
+                'status': 'ok',
+                'genes': len(self.batch.genes),
+                'workers': self.batch.workers,
+                'jobs_succeeded': self.jobs_succeeded,
+                'jobs_failed': self.jobs_failed
+            }
+
+    def default_output_path(self, dna_file_path: str) -> str:
+        """
+        Return the report path for a kit submitted without an output path.
+
+        Kits are named after their file, which is rarely unique across
+        requests (every Ancestry download is AncestryDNA.txt), so the name
+        carries the parent directory and a hash of the absolute path.
+        """
+        name = self.batch.sample_names([dna_file_path])[0]
+        parent = Path(dna_file_path).resolve().parent.name
+        if parent and not name.startswith(parent + '-'):
+            name = f"{parent}-{name}"
+        digest = hashlib.blake2b(os.path.abspath(dna_file_path).encode('utf-8'), digest_size=4).hexdigest()
+        return os.path.join(self.batch.output_dir, f"{name}-{digest}{self.batch.REPORT_SUFFIX}")
+
+    def job_output_path(self, dna_file_path: str, output: Optional[str] = None) -> str:
+        """
+        Return the report path for a submitted job.
+
+        Args:
+            dna_file_path: Kit the job analyzes.
+            output: Report path relative to the output directory, or None
+                for default_output_path().
+
+        Raises:
+            ValueError: If output resolves to a path outside the output
+                directory.
+        """
+        if output is None:
+            return self.default_output_path(dna_file_path)
+        output_dir = os.path.realpath(self.batch.output_dir)
+        output_path = os.path.realpath(os.path.join(output_dir, output))
+        if os.path.commonpath([output_dir, output_path]) != output_dir:
+            raise ValueError(f"output must stay inside {self.batch.output_dir}: {output}")
+        if output_path == output_dir:
+            raise ValueError(f"output must name a file: {output}")
+        return output_path
+
+    def analyze(
+        self,
+        dna_file_path: str,
+        output_path: Optional[str] = None,
+        include_report: bool = False
+    ) -> Tuple[int, Dict[str, Any]]:
+        """
+        Analyze one kit on the worker pool.
+
+        Returns:
+            HTTP status (200, or 422 if the sample failed) and the sample
+            outcome in the format of BatchAnalyzer.summary_dict().
+        """
+        if output_path is None:
+            output_path = self.default_output_path(dna_file_path)
+
+        try:
+            result = self._executor.submit(_analyze_sample, dna_file_path, output_path).result()
+        except Exception as e:
+            result = SampleResult(
+                dna_file_path=dna_file_path,
+                output_path=output_path,
+                success=False,
+                elapsed_seconds=0.0,
+                error=f"{type(e).__name__}: {e}"
+            )
+
+        with self._lock:
+            if result.success:
+                self.jobs_succeeded += 1
+            else:
+                self.jobs_failed += 1
+
+        payload = BatchAnalyzer.summary_dict([result])[0]
+        if result.success and include_report:
+            with open(output_path, 'r', encoding='utf-8') as f:
+                payload['report'] = f.read()
+
+        logger.info(
+            "%-7s %8.3fs  %s  %s",
+            'OK' if result.success else 'FAILED', result.elapsed_seconds, dna_file_path,
+            f"{result.variants_found}/{result.variants_checked} variants" if result.success else result.error
+        )
+        return (200 if result.success else 422), payload
+
+    def serve(self, address: str, allow_remote: bool = False):
+        """Serve jobs on `address` (see make_server) until interrupted or terminated."""
+        try:
+            server = self.make_server(address, allow_remote)
+        except (ValueError, OSError) as e:
+            logger.error("Could not listen on %s: %s", address, e)
+            sys.exit(1)
+        server.analysis = self
+        # shutdown() waits for serve_forever() to return, so it needs its own thread
+        signal.signal(signal.SIGTERM, lambda signum, frame: threading.Thread(target=server.shutdown).start())
+        self.start()
+        logger.info("Listening on %s with %d workers", address, self.batch.workers)
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            logger.info("Shutting down")
+            server.server_close()
+            if isinstance(server, _UnixHTTPServer) and os.path.exists(server.server_address):
+                os.remove(server.server_address)
+            self.stop()
+
+
 # ============================================================================
 # Main Application
 # ============================================================================
 
-def main():
+DEFAULT_DNA_FILE = 'dna-test-results/dna-data-2026-01-12/AncestryDNA.txt'
+DEFAULT_CATALOG_PATH = 'hidden/important-genes-2'
+DEFAULT_OUTPUT_PATH = 'SUMMARY-FROM-RAW-DNA.md'
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description='DNA Analysis Report System')
+    parser.add_argument(
+        'dna_files', nargs='*', default=[DEFAULT_DNA_FILE],
+        help='raw DNA file(s) to analyze; more than one file runs batch mode'
+    )
+    parser.add_argument('--catalog', default=DEFAULT_CATALOG_PATH, help='gene catalog directory')
+    parser.add_argument('--output', default=DEFAULT_OUTPUT_PATH, help='report path for a single sample')
+    parser.add_argument(
+        '--batch-output-dir',
+        help='write one report per sample into this directory (implies batch mode)'
+    )
+    parser.add_argument(
+        '--cohort-dir',
+        help='in batch mode, also add each sample to the cohort genotype matrix in this directory'
+    )
+    parser.add_argument(
+        '--workers', type=int, default=os.cpu_count() or 1,
+        help='worker processes for catalog parsing and batch analysis'
+    )
+    parser.add_argument(
+        '--exclude-no-calls', action='store_true',
+        help="do not match genotypes with a '0' (no-call) allele"
+    )
+    parser.add_argument(
+        '--min-call-rate', type=float, default=0.0,
+        help='fail a sample whose call rate (0-1) is below this, before matching'
+    )
+    parser.add_argument(
+        '--position-match', choices=VariantMatcher.POSITION_MODES,
+        help='also match catalog variants whose rsid is missing by chromosome and position, '
+             'with one binary search per variant (lookup) or one sweep per chromosome (merge)'
+    )
+    parser.add_argument(
+        '--incremental', action='store_true',
+        help='keep reports up to date with catalog edits: only categories whose genes changed '
+             'are matched and rendered again (state is kept next to each report)'
+    )
+    parser.add_argument(
+        '--export', nargs='+', default=[], metavar='FORMAT', choices=sorted(RESULT_EXPORTERS),
+        help='also write the results as machine-readable data next to each report: '
+             + ', '.join(f"{name} ({cls.description})" for name, cls in sorted(RESULT_EXPORTERS.items()))
+    )
+    parser.add_argument(
+        '--no-markdown', action='store_true',
+        help='skip the Markdown report and only write the --export formats'
+    )
+    parser.add_argument(
+        '--database',
+        help='also store the catalog and every sample\'s matched calls in this SQLite file '
+             'for ad-hoc queries'
+    )
+    parser.add_argument(
+        '--serve', metavar='ADDRESS',
+        help='keep the catalog loaded and analyze kits posted to /analyze on HOST:PORT, PORT '
+             'or unix:PATH; reports default to --batch-output-dir'
+    )
+    parser.add_argument(
+        '--targeted', action='store_true',
+        help="parse only the catalog's rsids and skip the DNA sidecar cache; fastest for a kit "
+             "analyzed once (parse stats then cover the targeted rows only)"
+    )
+    parser.add_argument(
+        '--serve-remote', action='store_true',
+        help='allow --serve HOST to be a non-loopback address, exposing the API to other machines'
+    )
+    parser.add_argument(
+        '--rsid-merge-history',
+        help='rsid merge history (dbSNP RsMergeArch or two-column old/new rsid file); '
+             'compiled to a memory-mapped .rsmerge sidecar on first use'
+    )
+    parser.add_argument(
+        '--log-level', default='INFO',
+        choices=['DEBUG', 'INFO', 'WARNING', 'ERROR'],
+        help='logging verbosity (default: INFO)'
+    )
+    parser.add_argument(
+        '--metrics-json',
+        help='write per-phase wall time, rows and bytes read, and the process peak RSS, to this JSON file'
+    )
+    return parser.parse_args(argv)
+
+
+class ConsoleFormatter(logging.Formatter):
+    """Plain console messages; warnings and errors get a 'Warning:'/'Error:' prefix."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        message = super().format(record)
+        if record.levelno >= logging.WARNING:
+            return f"{record.levelname.capitalize()}: {message}"
+        return message
+
+
+def configure_logging(level: str):
+    """Send log records to stdout, formatted like the original console output."""
+    handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(ConsoleFormatter('%(message)s'))
+    logger.handlers[:] = [handler]
+    logger.setLevel(level)
+    logger.propagate = False
+
+
+def open_database(path: Optional[str]) -> Optional[ResultDatabase]:
+    """Open the results database given on the command line, if any."""
+    if not path:
+        return None
+    try:
+        return ResultDatabase(path)
+    except sqlite3.Error as e:
+        logger.error("Could not open results database %s: %s", path, e)
+        sys.exit(1)
+
+
+def open_cohort(path: Optional[str], genes: List[Gene]) -> Optional[CohortMatrix]:
+    """Open or create the cohort matrix given on the command line, if any."""
+    if not path:
+        return None
+    try:
+        return CohortMatrix(path, sorted(GeneCatalogLoader.collect_rsids(genes)))
+    except (OSError, ValueError) as e:
+        logger.error("Could not open cohort matrix %s: %s", path, e)
+        sys.exit(1)
+
+
+def load_merge_table(path: Optional[str]) -> Optional[RsidMergeTable]:
+    """Open the rsid merge history given on the command line, if any."""
+    if not path:
+        return None
+    try:
+        return RsidMergeTable.load(path)
+    except (OSError, ValueError, struct.error) as e:
+        logger.error("Could not load rsid merge history %s: %s", path, e)
+        sys.exit(1)
+
+
+def run_batch(args: argparse.Namespace, metrics: PipelineMetrics) -> bool:
+    """
+    Batch entry point: one catalog load, many DNA files.
+
+    Returns:
+        True if every sample succeeded.
+    """
+    logger.info("Phase 1: Loading Gene Catalog")
+    logger.info("-" * 70)
+    with metrics.phase('catalog') as phase:
+        catalog_loader = GeneCatalogLoader(
+            args.catalog, use_snapshot=True, workers=args.workers, database=open_database(args.database)
+        )
+        genes = catalog_loader.load()
+        phase.rows_processed = catalog_loader.files_parsed
+        phase.bytes_read = catalog_loader.bytes_read
+    logger.info("")
+
+    logger.info("Phase 2-5: Analyzing Samples")
+    logger.info("-" * 70)
+    with metrics.phase('samples') as phase:
+        cohort = open_cohort(args.cohort_dir, genes)
+
+        batch = BatchAnalyzer(
+            genes,
+            args.batch_output_dir or 'reports',
+            workers=args.workers,
+            use_cache=not args.targeted,
+            cohort=cohort,
+            exclude_no_calls=args.exclude_no_calls,
+            min_call_rate=args.min_call_rate,
+            position_match=args.position_match,
+            merge_table=load_merge_table(args.rsid_merge_history),
+            gene_hashes=catalog_loader.gene_hashes if args.incremental else None,
+            export_formats=args.export,
+            markdown=not args.no_markdown,
+            database_path=args.database
+        )
+        results = batch.run(args.dna_files)
+        phase.rows_processed = len(results)
+    logger.info("")
+
+    BatchAnalyzer.log_summary(results)
+    logger.info("")
+
+    metrics.extra['samples'] = BatchAnalyzer.summary_dict(results)
+    return all(r.success for r in results)
+
+
+def run_server(args: argparse.Namespace, metrics: PipelineMetrics):
+    """Server entry point: one catalog load, kits submitted until interrupted."""
+    logger.info("Phase 1: Loading Gene Catalog")
+    logger.info("-" * 70)
+    with metrics.phase('catalog') as phase:
+        catalog_loader = GeneCatalogLoader(
+            args.catalog, use_snapshot=True, workers=args.workers, database=open_database(args.database)
+        )
+        genes = catalog_loader.load()
+        phase.rows_processed = catalog_loader.files_parsed
+        phase.bytes_read = catalog_loader.bytes_read
+    logger.info("")
+
+    logger.info("Phase 2-5: Serving Analysis Requests")
+    logger.info("-" * 70)
+    server = AnalysisServer(BatchAnalyzer(
+        genes,
+        args.batch_output_dir or 'reports',
+        workers=args.workers,
+        use_cache=not args.targeted,
+        exclude_no_calls=args.exclude_no_calls,
+        min_call_rate=args.min_call_rate,
+        position_match=args.position_match,
+        merge_table=load_merge_table(args.rsid_merge_history),
+        gene_hashes=catalog_loader.gene_hashes if args.incremental else None,
+        export_formats=args.export,
+        markdown=not args.no_markdown,
+        database_path=args.database
+    ))
+    with metrics.phase('serve') as phase:
+        server.serve(args.serve, args.serve_remote)
+        phase.rows_processed = server.jobs_succeeded + server.jobs_failed
+    metrics.extra['jobs'] = server.status()
+
+
+def main(argv: Optional[List[str]] = None):
     """Main application entry point."""
-    print("=" * 70)
-    print("DNA Analysis Report System")
-    print("=" * 70)
-    print()
+    args = parse_args(argv)
+    configure_logging(args.log_level)
+    metrics = PipelineMetrics()
+
+    logger.info("=" * 70)
+    logger.info("DNA Analysis Report System")
+    logger.info("=" * 70)
+    logger.info("")
+
+    for name in args.export:
+        if not RESULT_EXPORTERS[name].available():
+            logger.error("Export format %s is not available: %s", name, RESULT_EXPORTERS[name].description)
+            sys.exit(1)
+    if args.no_markdown and not args.export:
+        logger.error("--no-markdown needs at least one --export format")
+        sys.exit(1)
+    if args.no_markdown and args.incremental:
+        logger.error("--no-markdown cannot be combined with --incremental, which updates the Markdown report")
+        sys.exit(1)
+    if args.targeted and args.position_match:
+        logger.error("--targeted cannot be combined with --position-match, which needs every row of the DNA file")
+        sys.exit(1)
+
+    if args.serve:
+        run_server(args, metrics)
+        if args.metrics_json:
+            metrics.write_json(args.metrics_json)
+        return
+
+    if args.batch_output_dir or args.cohort_dir or len(args.dna_files) > 1:
+        success = run_batch(args, metrics)
+        if args.metrics_json:
+            metrics.write_json(args.metrics_json)
+        if not success:
+            sys.exit(1)
+        return
 
     # Configuration
-    dna_file_path = 'dna-test-results/dna-data-2026-01-12/AncestryDNA.txt'
-    catalog_path = 'hidden/important-genes-2'
-    output_path = 'SUMMARY-FROM-RAW-DNA.md'
-
-    # Phase 1: Parse DNA Data
-    print("Phase 1: Parsing DNA Data")
-    print("-" * 70)
-    parser = DNAParser(dna_file_path)
-    genotypes = parser.parse()
-    print()
-
-    # Phase 2: Load Gene Catalog
-    print("Phase 2: Loading Gene Catalog")
-    print("-" * 70)
-    catalog_loader = GeneCatalogLoader(catalog_path)
-    genes = catalog_loader.load()
-    print()
-
-    # Phase 3: Match Variants
-    print("Phase 3: Matching Variants")
-    print("-" * 70)
-    matcher = VariantMatcher(genotypes)
-    match_results = matcher.match(genes)
-    print()
-
-    # Phase 4 & 5: Generate Report
-    print("Phase 4 & 5: Generating Report")
-    print("-" * 70)
-    report_generator = ReportGenerator(genes, match_results, dna_file_path)
-    report_generator.generate(output_path)
-    print()
-
-    print("=" * 70)
-    print("Analysis Complete!")
-    print("=" * 70)
-    print(f"Report saved to: {output_path}")
-    print()
+    dna_file_path = args.dna_files[0]
+    catalog_path = args.catalog
+    output_path = args.output
+    database = open_database(args.database)
+
+    def load_catalog() -> Tuple[List[Gene], List[str]]:
+        with metrics.phase('catalog') as phase:
+            catalog_loader = GeneCatalogLoader(
+                catalog_path, use_snapshot=True, workers=args.workers, database=database
+            )
+            genes = catalog_loader.load()
+            phase.rows_processed = catalog_loader.files_parsed
+            phase.bytes_read = catalog_loader.bytes_read
+        return genes, catalog_loader.gene_hashes
+
+    def parse_dna(target_rsids: Optional[Set[str]] = None) -> GenotypeStore:
+        # The sidecar cache always holds every genotype, so parsing needs no
+        # target rsids from the catalog and can run alongside it. Targeted
+        # parses skip the cache and wait for the catalog instead.
+        with metrics.phase('parse') as phase:
+            parser = DNAParser(
+                dna_file_path,
+                target_rsids=target_rsids,
+                use_cache=not args.targeted,
+                exclude_no_calls=args.exclude_no_calls,
+                position_index=args.position_match is not None
+            )
+            genotypes = parser.parse()
+            phase.rows_processed = parser.lines_read
+            phase.bytes_read = parser.bytes_read
+        metrics.extra['parse_stats'] = parser.stats.to_dict()
+
+        if parser.stats.call_rate < args.min_call_rate:
+            logger.error(
+                "Call rate %.2f%% is below the minimum of %.2f%%; skipping analysis",
+                parser.stats.call_rate * 100, args.min_call_rate * 100
+            )
+            if args.metrics_json:
+                metrics.write_json(args.metrics_json)
+            sys.exit(1)
+        return genotypes
+
+    def parse_targeted(catalog: Tuple[List[Gene], List[str]], merge_table: Optional[RsidMergeTable]) -> GenotypeStore:
+        return parse_dna(GeneCatalogLoader.collect_rsids(catalog[0], merge_table))
+
+    def update_report(catalog: Tuple[List[Gene], List[str]], merge_table: Optional[RsidMergeTable]) -> MatchResults:
+        genes, gene_hashes = catalog
+        # Phases 2-5, limited to the categories whose genes changed
+        logger.info("")
+        logger.info("Phase 2-5: Updating Report")
+        logger.info("-" * 70)
+        reporter = IncrementalReporter(
+            GeneCatalogLoader.build_index(genes),
+            gene_hashes,
+            args.position_match,
+            merge_table,
+            args.exclude_no_calls
+        )
+        with metrics.phase('incremental') as phase:
+            parse = (lambda: parse_targeted(catalog, merge_table)) if args.targeted else parse_dna
+            update, match_results = reporter.update(dna_file_path, output_path, parse)
+            phase.rows_processed = len(match_results.matched_variants)
+        if database is not None:
+            database.write_sample(dna_file_path, match_results)
+        metrics.extra['update'] = update
+        logger.info("Report update: %s", update)
+        logger.info("")
+        return match_results
+
+    def match_variants(
+        catalog: Tuple[List[Gene], List[str]],
+        genotypes: GenotypeStore,
+        merge_table: Optional[RsidMergeTable]
+    ) -> MatchResults:
+        logger.info("")
+        logger.info("Phase 3: Matching Variants")
+        logger.info("-" * 70)
+        with metrics.phase('match') as phase:
+            matcher = VariantMatcher(
+                genotypes,
+                position_match=args.position_match,
+                merge_table=merge_table,
+                database=database,
+                sample=dna_file_path
+            )
+            match_results = matcher.match(catalog[0])
+            phase.rows_processed = match_results.total_variants_checked
+        logger.info("")
+        return match_results
+
+    def write_report(catalog: Tuple[List[Gene], List[str]], match_results: MatchResults):
+        report_generator = ReportGenerator(catalog[0], match_results, dna_file_path)
+        if not args.incremental and not args.no_markdown:
+            logger.info("Phase 4 & 5: Generating Report")
+            logger.info("-" * 70)
+            with metrics.phase('report') as phase:
+                report_generator.generate(output_path)
+                phase.rows_processed = len(match_results.matched_variants)
+            logger.info("")
+
+        if args.export:
+            logger.info("Exporting Results")
+            logger.info("-" * 70)
+            with metrics.phase('export') as phase:
+                for path in export_results(report_generator, output_path, args.export):
+                    logger.info("Exported: %s", path)
+                phase.rows_processed = len(match_results.matched_variants)
+            logger.info("")
+
+    # The catalog, the merge history and the DNA file load concurrently;
+    # matching starts once all three are ready
+    scheduler = PhaseScheduler()
+    scheduler.add('catalog', load_catalog)
+    scheduler.add('merge_table', lambda: load_merge_table(args.rsid_merge_history))
+    if args.incremental:
+        logger.info("Phase 1: Loading Gene Catalog")
+        logger.info("-" * 70)
+        scheduler.add('match_results', update_report, after=('catalog', 'merge_table'))
+    else:
+        logger.info("Phase 1 & 2: Loading Gene Catalog and Parsing DNA Data")
+        logger.info("-" * 70)
+        if args.targeted:
+            scheduler.add('genotypes', parse_targeted, after=('catalog', 'merge_table'))
+        else:
+            scheduler.add('genotypes', parse_dna)
+        scheduler.add('match_results', match_variants, after=('catalog', 'genotypes', 'merge_table'))
+    if args.export or not args.incremental:
+        scheduler.add('report', write_report, after=('catalog', 'match_results'))
+    scheduler.run()
+
+    logger.info("=" * 70)
+    logger.info("Analysis Complete!")
+    logger.info("=" * 70)
+    if not args.no_markdown:
+        logger.info("Report saved to: %s", output_path)
+    logger.info("")
+
+    if args.metrics_json:
+        metrics.write_json(args.metrics_json)
 
 
 if __name__ == '__main__':